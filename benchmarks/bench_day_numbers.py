@@ -0,0 +1,109 @@
+"""Microbenchmark for the day number functions in utils.time.
+
+Compares the original implementation (localising each timestamp with pytz)
+against get_day_from_timestamp, get_day_from_snowflake and the vectorised
+numpy path, over random Discord message ids, after checking they all agree.
+
+Usage:
+    python benchmarks/bench_day_numbers.py [count] [repeats]
+"""
+
+import random
+import sys
+import timeit
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pytz
+from discord.utils import snowflake_time
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+from utils import time  # noqa: E402
+
+tz = pytz.timezone("Australia/Adelaide")
+
+
+def original_day_from_timestamp(timestamp: datetime):
+    """utils.time.get_day_from_timestamp before the fast path"""
+    if timestamp.tzinfo is None:
+        timestamp = tz.localize(timestamp)
+    else:
+        timestamp = timestamp.astimezone(tz)
+    epoch = datetime(1970, 1, 1, tzinfo=tz)
+    return (timestamp - epoch).days
+
+
+def random_snowflakes(count: int) -> list[int]:
+    # Ids from 2016 to 2030
+    low = int((1451606400000 - time.DISCORD_EPOCH_MS) << 22)
+    high = int((1893456000000 - time.DISCORD_EPOCH_MS) << 22)
+    return [random.randrange(low, high) for _ in range(count)]
+
+
+def bench(name: str, func, count: int, repeats: int, baseline: float = None) -> float:
+    best = min(timeit.repeat(func, number=1, repeat=repeats))
+    per_item = best / count * 1e9
+    speedup = f"  {baseline / best:6.1f}x" if baseline else ""
+    print(f"{name:<40} {best * 1000:8.2f} ms  {per_item:7.1f} ns/id{speedup}")
+    return best
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    random.seed(0)
+
+    ids = random_snowflakes(count)
+    created = [snowflake_time(i) for i in ids]
+    id_array = np.array(ids, dtype=np.int64)
+
+    expected = [original_day_from_timestamp(c) for c in created]
+    assert [time.get_day_from_timestamp(c) for c in created] == expected
+    assert [time.get_day_from_snowflake(i) for i in ids] == expected
+    assert time.get_day_from_snowflake(id_array).tolist() == expected
+
+    print(f"{count} message ids, best of {repeats} runs")
+    print("From created_at datetimes:")
+    baseline = bench(
+        "original get_day_from_timestamp",
+        lambda: [original_day_from_timestamp(c) for c in created],
+        count,
+        repeats,
+    )
+    bench(
+        "get_day_from_timestamp",
+        lambda: [time.get_day_from_timestamp(c) for c in created],
+        count,
+        repeats,
+        baseline,
+    )
+
+    # created_at is derived from the id, so this is what the call sites paid
+    print("From message ids:")
+    baseline = bench(
+        "original, via snowflake_time",
+        lambda: [original_day_from_timestamp(snowflake_time(i)) for i in ids],
+        count,
+        repeats,
+    )
+    bench(
+        "get_day_from_snowflake",
+        lambda: [time.get_day_from_snowflake(i) for i in ids],
+        count,
+        repeats,
+        baseline,
+    )
+    bench(
+        "get_day_from_snowflake (numpy array)",
+        lambda: time.get_day_from_snowflake(id_array),
+        count,
+        repeats,
+        baseline,
+    )
+
+
+if __name__ == "__main__":
+    main()
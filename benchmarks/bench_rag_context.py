@@ -0,0 +1,102 @@
+"""Microbenchmark for CMS RAG context assembly.
+
+Compares per-query overhead of `build_cms_context_for_query` when every topic
+block is re-rendered (the behaviour before memoisation) against memoised blocks.
+CMS responses are synthetic, so no network access is needed.
+
+Usage:
+    python benchmarks/bench_rag_context.py [iterations]
+"""
+
+import sys
+import timeit
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from utils import cms, gemini_rag  # noqa: E402
+
+QUERIES = [
+    "what events are coming up this week?",
+    "who is on the committee and what projects are open source?",
+    "which company sponsors the club, and what were the recent events?",
+    "how do I get a locker in the duck lounge?",
+]
+
+
+def _fake_events(count: int) -> list[dict]:
+    now = datetime.now(timezone.utc)
+    events = []
+    for i in range(count):
+        start = now + timedelta(days=i - count // 2, hours=18)
+        events.append(
+            {
+                "title": f"Event {i}",
+                "date": start.isoformat(),
+                "time": {
+                    "start": start.isoformat(),
+                    "end": (start + timedelta(hours=3)).isoformat(),
+                },
+                "location": "EM110",
+                "details": "A night of games, food and talks. " * 8,
+            }
+        )
+    return events
+
+
+def _fake_fetch(endpoint, params=None, timeout=50):
+    if endpoint == cms.EVENTS_ENDPOINT:
+        docs = _fake_events(120)
+        return {"docs": docs, "page": 1, "totalPages": 1, "totalDocs": len(docs)}
+    if endpoint == cms.COMMITTEE_ENDPOINT:
+        return {"docs": [{"name": f"Member {i}", "role": "Officer"} for i in range(30)]}
+    if endpoint == cms.PROJECTS_ENDPOINT:
+        return {
+            "docs": [
+                {"title": f"Project {i}", "description": "An open-source project."}
+                for i in range(20)
+            ]
+        }
+    if endpoint == cms.SPONSORS_ENDPOINT:
+        return {
+            "docs": [
+                {"name": f"Company {i}", "tier": ("gold", "silver", "bronze")[i % 3]}
+                for i in range(15)
+            ]
+        }
+    return None
+
+
+def _run_queries():
+    for q in QUERIES:
+        gemini_rag.build_cms_context_for_query(q)
+
+
+def _run_queries_unmemoised():
+    for q in QUERIES:
+        gemini_rag.clear_context_cache()
+        gemini_rag.build_cms_context_for_query(q)
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    cms._fetch_from_cms = _fake_fetch
+
+    # Warm the CMS response cache so both runs measure rendering only
+    _run_queries()
+
+    per_query = iterations * len(QUERIES)
+    before = timeit.timeit(_run_queries_unmemoised, number=iterations) / per_query
+    gemini_rag.clear_context_cache()
+    _run_queries()
+    after = timeit.timeit(_run_queries, number=iterations) / per_query
+
+    print(f"queries per run:          {per_query}")
+    print(f"re-rendered blocks:       {before * 1e6:9.1f} us/query")
+    print(f"memoised blocks:          {after * 1e6:9.1f} us/query")
+    print(f"speedup:                  {before / after:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,470 @@
+"""Offline replay benchmark for DuckBot's reaction and message handlers.
+
+Replays a stream of skull reaction add/remove and guild message events
+against the DuckBot built by `main`, with Discord replaced by a fake
+client/guild/channel/message layer. Each fake REST call (fetching a channel,
+message or member, a page of history, sending, editing, deleting, replying)
+sleeps for a configurable latency. The databases are real sqlite files in a
+temporary directory. Reports throughput, p50/p99 handler latency per event
+type, and the REST calls and SQL statements made per event.
+
+The stream is synthetic by default (a few busy posts collect most skulls,
+and some messages are spam). It can be saved with --record and replayed
+with --input, as JSON lines such as:
+    {"type": "reaction_add", "message_id": 1, "channel_id": 2, "user_id": 3,
+     "author_id": 4, "content": "..."}
+    {"type": "message", "message_id": 5, "channel_id": 2, "author_id": 4,
+     "content": "..."}
+Messages a reaction refers to are created on first use from its author_id
+and content.
+
+Usage:
+    python benchmarks/bench_replay.py [--events N] [--latency-ms MS]
+        [--jitter-ms MS] [--concurrency N] [--seed N]
+        [--input events.jsonl] [--record events.jsonl]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import traceback
+from collections import Counter, defaultdict
+from pathlib import Path
+from types import SimpleNamespace
+
+import discord
+from discord.utils import snowflake_time
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+GUILD_ID = 1000
+SKULLBOARD_CHANNEL_ID = 2000
+CHANNEL_IDS = [2001, 2002, 2003]
+BOT_ID = 3000
+USER_IDS = list(range(4000, 4050))
+REQUIRED_REACTIONS = 3
+DISCORD_EPOCH_MS = 1420070400000
+
+MESSAGES = [
+    "anyone else stuck on the assignment 2 linked list question?",
+    "the duck lounge has free pizza right now",
+    "just pushed the fix, can someone review my PR",
+    "why does my code only work when I add a print statement",
+    "who's coming to the games night on friday?",
+    "I accidentally ran rm -rf on my home directory",
+]
+SPAM_MESSAGES = [
+    "Giving away my MacBook for free, in perfect health, dm me if you are interested",
+    "Top-tier tutors to ace your assignments, text me on whatsapp",
+]
+
+
+def snowflake(offset_ms: int, sequence: int) -> int:
+    """An id created `offset_ms` ago, so messages fall inside the 7-day tracking window."""
+    created_ms = int(time.time() * 1000) - offset_ms
+    return ((created_ms - DISCORD_EPOCH_MS) << 22) + (sequence & 0x3FFFFF)
+
+
+class FakeRest:
+    """Counts REST calls by kind, sleeping for the simulated round trip of each."""
+
+    def __init__(self, latency: float, jitter: float, rng: random.Random):
+        self.latency = latency
+        self.jitter = jitter
+        self.rng = rng
+        self.calls = Counter()
+
+    async def call(self, kind: str):
+        self.calls[kind] += 1
+        delay = max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter))
+        if delay:
+            await asyncio.sleep(delay)
+
+
+class FakeRole:
+    def __init__(self, position: int):
+        self.position = position
+
+    def __ge__(self, other):
+        return self.position >= other.position
+
+
+class FakeUser:
+    def __init__(self, user_id: int, rest: FakeRest, bot: bool = False):
+        self.id = user_id
+        self.name = f"user{user_id}"
+        self.display_name = self.name
+        self.nick = None
+        self.bot = bot
+        self.avatar = None
+        self.display_avatar = SimpleNamespace(url=f"https://cdn.example/{user_id}.png")
+        self.mention = f"<@{user_id}>"
+        self.top_role = FakeRole(10 if bot else 1)
+        self.rest = rest
+
+    def mentioned_in(self, message) -> bool:
+        return any(user.id == self.id for user in message.mentions)
+
+    async def timeout(self, duration, reason=None):
+        await self.rest.call("timeout")
+
+
+class FakeGuild:
+    def __init__(self, guild_id: int, members: dict, me: FakeUser, rest: FakeRest):
+        self.id = guild_id
+        self.members = members
+        self.me = me
+        self.rest = rest
+
+    def get_member(self, user_id: int):
+        return self.members.get(user_id)
+
+    async def fetch_member(self, user_id: int):
+        await self.rest.call("fetch_member")
+        return self.members[user_id]
+
+
+class FakeReaction:
+    def __init__(self, emoji: str, count: int = 0):
+        self.emoji = emoji
+        self.count = count
+
+
+class FakeMessage:
+    def __init__(self, message_id: int, channel, author: FakeUser, content: str):
+        self.id = message_id
+        self.channel = channel
+        self.guild = channel.guild
+        self.author = author
+        self.content = content
+        self.clean_content = content
+        self.created_at = snowflake_time(message_id)
+        self.reactions: list[FakeReaction] = []
+        self.mentions: list[FakeUser] = []
+        self.mention_everyone = False
+        self.stickers = []
+        self.attachments = []
+
+    @property
+    def jump_url(self) -> str:
+        return (
+            f"https://discord.com/channels/{self.guild.id}/{self.channel.id}/{self.id}"
+        )
+
+    def skulls(self) -> FakeReaction:
+        for reaction in self.reactions:
+            if reaction.emoji == "💀":
+                return reaction
+        reaction = FakeReaction("💀")
+        self.reactions.append(reaction)
+        return reaction
+
+    async def edit(self, content=None, embed=None, **kwargs):
+        await self.channel.rest.call("edit")
+        if content is not None:
+            self.content = content
+
+    async def delete(self):
+        await self.channel.rest.call("delete")
+        self.channel.messages.pop(self.id, None)
+
+    async def reply(self, content=None, **kwargs):
+        await self.channel.rest.call("reply")
+
+
+class FakeChannel:
+    def __init__(self, channel_id: int, guild: FakeGuild, rest: FakeRest):
+        self.id = channel_id
+        self.guild = guild
+        self.rest = rest
+        self.mention = f"<#{channel_id}>"
+        self.messages: dict[int, FakeMessage] = {}
+        self._sequence = 0
+
+    async def fetch_message(self, message_id: int) -> FakeMessage:
+        await self.rest.call("fetch_message")
+        message = self.messages.get(message_id)
+        if message is None:
+            raise discord.NotFound(
+                SimpleNamespace(status=404, reason="Not Found"), "Unknown Message"
+            )
+        return message
+
+    async def history(self, limit: int = 100, before=None):
+        """Newest first, one REST call per page of 100 messages."""
+        ids = sorted(self.messages, reverse=True)
+        if before is not None:
+            ids = [i for i in ids if i < before.id]
+        for start in range(0, min(limit, len(ids)), 100):
+            await self.rest.call("history_page")
+            for message_id in ids[start : min(start + 100, limit)]:
+                message = self.messages.get(message_id)
+                if message is not None:
+                    yield message
+
+    async def send(self, content=None, embed=None, **kwargs) -> FakeMessage:
+        await self.rest.call("send")
+        self._sequence += 1
+        message = FakeMessage(
+            snowflake(0, self._sequence), self, self.guild.me, content or ""
+        )
+        self.messages[message.id] = message
+        return message
+
+
+class FakeDiscord:
+    """One guild with a few channels, a skullboard channel and a pool of users."""
+
+    def __init__(self, rest: FakeRest):
+        self.rest = rest
+        self.bot_user = FakeUser(BOT_ID, rest, bot=True)
+        self.users = {user_id: FakeUser(user_id, rest) for user_id in USER_IDS}
+        self.guild = FakeGuild(GUILD_ID, dict(self.users), self.bot_user, rest)
+        self.channels = {
+            channel_id: FakeChannel(channel_id, self.guild, rest)
+            for channel_id in (SKULLBOARD_CHANNEL_ID, *CHANNEL_IDS)
+        }
+
+    def attach(self, client):
+        """Point the client's cache lookups and REST fetches at this fake guild."""
+        client._connection.user = self.bot_user
+        client.get_channel = self.channels.get
+        client.get_guild = lambda guild_id: (
+            self.guild if guild_id == self.guild.id else None
+        )
+
+        async def fetch_channel(channel_id):
+            await self.rest.call("fetch_channel")
+            return self.channels[channel_id]
+
+        client.fetch_channel = fetch_channel
+
+    def get_or_create_message(self, event: dict) -> FakeMessage:
+        channel = self.channels[event["channel_id"]]
+        message = channel.messages.get(event["message_id"])
+        if message is None:
+            author = self.users.get(event.get("author_id")) or self.users[USER_IDS[0]]
+            message = FakeMessage(
+                event["message_id"], channel, author, event.get("content", "")
+            )
+            if "mentions_bot" in event:
+                message.mentions = [self.bot_user] if event["mentions_bot"] else []
+            channel.messages[message.id] = message
+        return message
+
+
+def reaction_payload(event: dict, event_type: str) -> discord.RawReactionActionEvent:
+    data = {
+        "message_id": event["message_id"],
+        "channel_id": event["channel_id"],
+        "user_id": event["user_id"],
+        "guild_id": GUILD_ID,
+        "type": 0,
+    }
+    return discord.RawReactionActionEvent(
+        data, discord.PartialEmoji(name="💀"), event_type
+    )
+
+
+def generate_events(count: int, rng: random.Random) -> list[dict]:
+    """A stream of mostly skull reactions, concentrated on a few popular posts."""
+    posts = []
+    for i in range(max(10, count // 10)):
+        posts.append(
+            {
+                "message_id": snowflake(rng.randrange(6 * 24 * 3600 * 1000), i),
+                "channel_id": rng.choice(CHANNEL_IDS),
+                "author_id": rng.choice(USER_IDS),
+                "content": rng.choice(MESSAGES),
+            }
+        )
+    skulls = Counter()
+    events = []
+    for i in range(count):
+        kind = rng.random()
+        if kind < 0.15:
+            events.append(
+                {
+                    "type": "message",
+                    "message_id": snowflake(0, 0x200000 + i),
+                    "channel_id": rng.choice(CHANNEL_IDS),
+                    "author_id": rng.choice(USER_IDS),
+                    "content": rng.choice(
+                        SPAM_MESSAGES if rng.random() < 0.1 else MESSAGES
+                    ),
+                    "mentions_bot": rng.random() < 0.05,
+                }
+            )
+            continue
+        # Popularity follows a power law, so a few posts get most of the skulls
+        post = posts[min(int(rng.paretovariate(1.2)) - 1, len(posts) - 1)]
+        remove = kind > 0.85 and skulls[post["message_id"]] > 0
+        skulls[post["message_id"]] += -1 if remove else 1
+        events.append(
+            {
+                "type": "reaction_remove" if remove else "reaction_add",
+                "user_id": rng.choice(USER_IDS),
+                **post,
+            }
+        )
+    return events
+
+
+async def replay(client, world: FakeDiscord, events: list[dict], concurrency: int):
+    """Dispatch every event to its handler.
+
+    Returns (type, seconds, error) per event, and the first traceback of each
+    kind of error. As in discord.py's dispatcher, an exception from a handler
+    is logged and the replay carries on.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    tracebacks = {}
+
+    async def dispatch(event: dict):
+        async with semaphore:
+            message = world.get_or_create_message(event)
+            if event["type"] == "message":
+                handler = client.on_message(message)
+            else:
+                # Discord updates the message before sending the gateway event
+                skulls = message.skulls()
+                if event["type"] == "reaction_add":
+                    skulls.count += 1
+                    handler = client.on_raw_reaction_add(
+                        reaction_payload(event, "REACTION_ADD")
+                    )
+                else:
+                    skulls.count = max(0, skulls.count - 1)
+                    handler = client.on_raw_reaction_remove(
+                        reaction_payload(event, "REACTION_REMOVE")
+                    )
+            start = time.perf_counter()
+            error = None
+            try:
+                await handler
+            except Exception as e:
+                error = type(e).__name__
+                logging.exception(f"Handler for {event['type']} event failed")
+                tracebacks.setdefault((event["type"], error), traceback.format_exc())
+            latencies.append((event["type"], time.perf_counter() - start, error))
+
+    await asyncio.gather(*(dispatch(event) for event in events))
+    return latencies, tracebacks
+
+
+def percentile(ordered: list[float], fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def report(
+    latencies, tracebacks, elapsed: float, rest: FakeRest, sql_statements: int, args
+):
+    count = len(latencies)
+    print(
+        f"replayed {count} events in {elapsed:.2f} s: {count / elapsed:.1f} events/s "
+        f"(concurrency {args.concurrency}, REST latency {args.latency_ms:g}±{args.jitter_ms:g} ms)"
+    )
+    by_type = defaultdict(list)
+    errors = Counter()
+    for event_type, seconds, error in latencies:
+        # Failed events are timed too, up to the point they raised
+        by_type[event_type].append(seconds * 1000)
+        if error is not None:
+            errors[event_type, error] += 1
+    print(
+        f"{'event':<16} {'count':>6} {'errors':>6} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}"
+    )
+    for event_type, values in sorted(by_type.items()):
+        values.sort()
+        failed = sum(n for (kind, _), n in errors.items() if kind == event_type)
+        print(
+            f"{event_type:<16} {len(values):>6} {failed:>6} {statistics.median(values):9.2f} "
+            f"{percentile(values, 0.99):9.2f} {values[-1]:9.2f}"
+        )
+
+    total = sum(rest.calls.values())
+    print(f"REST calls per event: {total / count:.2f}")
+    for kind, calls in rest.calls.most_common():
+        print(f"  {kind:<16} {calls / count:.3f}")
+    print(f"SQL statements per event: {sql_statements / count:.2f}")
+
+    if errors:
+        print(f"\nHandler errors: {sum(errors.values())}")
+        for (event_type, error), n in errors.most_common():
+            print(f"{n} x {error} in {event_type}, first seen:")
+            print(tracebacks[event_type, error])
+
+
+async def run(args, events: list[dict]):
+    # Imported here, once the working directory and environment are set up
+    import main  # noqa: PLC0415
+    from models import database  # noqa: PLC0415
+    from utils import spam_detection  # noqa: PLC0415
+
+    client = main.client
+    rest = FakeRest(args.latency_ms / 1000, args.jitter_ms / 1000, random.Random(0))
+    world = FakeDiscord(rest)
+    world.attach(client)
+
+    await asyncio.gather(*(db.open() for db in client.databases))
+    client.admin_db.set_server_settings(
+        str(GUILD_ID), str(SKULLBOARD_CHANNEL_ID), REQUIRED_REACTIONS
+    )
+    # Known spam is normally fetched from the CMS once a day
+    spam_detection.fetch_spam_messages._cached_spam_messages = SPAM_MESSAGES
+    spam_detection.fetch_spam_messages._cache_time = discord.utils.utcnow()
+
+    try:
+        start = time.perf_counter()
+        latencies, tracebacks = await replay(client, world, events, args.concurrency)
+        elapsed = time.perf_counter() - start
+    finally:
+        for db in client.databases:
+            await db.close()
+
+    sql_statements = sum(stats.calls for stats in database.statement_stats.values())
+    report(latencies, tracebacks, elapsed, rest, sql_statements, args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--jitter-ms", type=float, default=10)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--input", type=Path, help="replay events from a JSON lines file"
+    )
+    parser.add_argument("--record", type=Path, help="save the events as JSON lines")
+    args = parser.parse_args()
+
+    if args.input:
+        events = [json.loads(line) for line in args.input.read_text().splitlines()]
+    else:
+        events = generate_events(args.events, random.Random(args.seed))
+    if args.record:
+        args.record.write_text("".join(json.dumps(event) + "\n" for event in events))
+
+    os.environ.setdefault("BOT_TOKEN", "bench")
+    os.environ.setdefault("REQUESTS_PER_MINUTE", "3")
+    os.environ["GEMINI_API_KEY"] = ""
+    os.environ["GEMINI_WARMUP"] = "false"
+
+    # Databases and logs are created relative to the working directory
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        asyncio.run(run(args, events))
+
+
+if __name__ == "__main__":
+    main()
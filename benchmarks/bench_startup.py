@@ -0,0 +1,75 @@
+"""Cold-start benchmark for DuckBot, failing if startup exceeds a time budget.
+
+Each run starts a fresh interpreter that imports `main` (which builds the
+DuckBot client without connecting) with STARTUP_PROFILE enabled, and
+reports the time from process start until the client is constructed. The
+median over all runs is compared against the budget, and the profile of the
+slowest run is printed.
+
+Usage:
+    python benchmarks/bench_startup.py [budget_ms] [runs]
+"""
+
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+PROBE = """
+import sys
+sys.path.insert(0, {src!r})
+import main
+from utils.startup_profiler import profiler
+print(profiler.report(top=15))
+print(f"TOTAL_MS {{profiler.elapsed() * 1000:.1f}}")
+"""
+
+
+def run_once(workdir: str) -> tuple[float, str]:
+    env = {
+        **os.environ,
+        "STARTUP_PROFILE": "true",
+        "BOT_TOKEN": os.environ.get("BOT_TOKEN", "bench"),
+        "REQUESTS_PER_MINUTE": os.environ.get("REQUESTS_PER_MINUTE", "3"),
+        "GEMINI_WARMUP": "false",
+    }
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE.format(src=str(ROOT / "src"))],
+        cwd=workdir,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total = float(re.search(r"TOTAL_MS ([\d.]+)", result.stdout).group(1))
+    return total, result.stdout
+
+
+def main():
+    budget_ms = float(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    # Databases are created relative to the working directory
+    with tempfile.TemporaryDirectory() as workdir:
+        results = [run_once(workdir) for _ in range(runs)]
+
+    totals = [total for total, _ in results]
+    print(max(results)[1].replace(f"TOTAL_MS {max(totals):.1f}", "").rstrip())
+    median = statistics.median(totals)
+    print(
+        f"\ncold start over {runs} runs: median {median:.0f} ms, "
+        f"min {min(totals):.0f} ms, max {max(totals):.0f} ms (budget {budget_ms:.0f} ms)"
+    )
+    if median > budget_ms:
+        print("FAIL: cold start exceeds the budget")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""End-to-end latency benchmark for the input token limit check in GeminiBot.query.
+
+Runs `query` against a stub genai client with simulated network round-trips,
+once with the local token estimator and once forcing every message through
+count_tokens (the behaviour before the estimator).
+
+Usage:
+    python benchmarks/bench_token_check.py [round_trip_ms] [iterations]
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+os.environ.setdefault("REQUESTS_PER_MINUTE", "1000000")
+
+MESSAGES = [
+    "how do I join the club?",
+    "can someone explain how quicksort partitions the array? " * 20,
+    "```python\n" + "def f(x):\n    return [i * x for i in range(10)]\n" * 60 + "```",
+    "ダックボットについて教えてください。" * 40,
+]
+
+
+class StubModels:
+    def __init__(self, round_trip: float):
+        self.round_trip = round_trip
+        self.count_tokens_calls = 0
+
+    async def count_tokens(self, model, contents):
+        self.count_tokens_calls += 1
+        await asyncio.sleep(self.round_trip)
+        return SimpleNamespace(total_tokens=len(contents) // 4)
+
+    async def generate_content(self, model, contents, config):
+        await asyncio.sleep(self.round_trip)
+        return SimpleNamespace(text="Quack!", usage_metadata=None)
+
+
+class StubCaches:
+    async def create(self, model, config):
+        return SimpleNamespace(name="cachedContents/bench")
+
+    async def update(self, name, config):
+        return None
+
+    async def delete(self, name):
+        return None
+
+
+async def run(bot, iterations: int) -> list[float]:
+    latencies = []
+    for _ in range(iterations):
+        for message in MESSAGES:
+            # Repeated messages would otherwise be answered from the response cache
+            bot.response_cache.clear()
+            start = time.perf_counter()
+            await bot.query(author_id=1, author="bench", message=message)
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def main():
+    round_trip = (float(sys.argv[1]) if len(sys.argv) > 1 else 150) / 1000
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Databases are created relative to the working directory on import
+        os.chdir(tmp)
+        from commands.gemini import GeminiBot  # noqa: PLC0415
+
+        GeminiBot.USER_REQUESTS_PER_DAY = 10**9
+        bot = GeminiBot(
+            model_name="models/bench",
+            data_csv_path=str(ROOT / "src/data/duckbot_train_data.csv"),
+            bot=None,
+            api_key="bench",
+        )
+        models = StubModels(round_trip)
+        stub = SimpleNamespace(aio=SimpleNamespace(models=models, caches=StubCaches()))
+        bot.client = stub
+        bot.context_cache.client = stub
+
+        estimator = bot.token_estimator
+        local = asyncio.run(run(bot, iterations))
+        local_calls = models.count_tokens_calls
+
+        models.count_tokens_calls = 0
+        estimator.within_limit = lambda text, limit: None
+        remote = asyncio.run(run(bot, iterations))
+        remote_calls = models.count_tokens_calls
+
+        # Database connections run on worker threads that outlive the loop unless closed
+        asyncio.run(bot.rate_limiter.db.close())
+
+    print(f"simulated round-trip:   {round_trip * 1000:.0f} ms")
+    for name, latencies, calls in (
+        ("count_tokens always", remote, remote_calls),
+        ("local estimator", local, local_calls),
+    ):
+        print(
+            f"{name:22}  p50 {statistics.median(latencies) * 1000:7.1f} ms  "
+            f"mean {statistics.mean(latencies) * 1000:7.1f} ms  "
+            f"count_tokens calls {calls}/{len(latencies)}"
+        )
+
+
+if __name__ == "__main__":
+    main()
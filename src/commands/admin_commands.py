@@ -1,24 +1,34 @@
 import logging
+from typing import Optional
 
 from discord import Color, Embed, Interaction, app_commands
 from dotenv import load_dotenv
 
 from commands.command_helpers import require_admin
+from models.database import (
+    SLOW_QUERY_MS,
+    SQL_STATS_ENABLED,
+    get_slowest_statements,
+    reset_statement_stats,
+)
 from models.databases.admin_settings_db import AdminSettingsDB
+from utils.loop_monitor import LOOP_MONITOR_ENABLED
 
 load_dotenv()
 
 
 class AdminCommands(app_commands.Group):
-    def __init__(self, gemini_bot):
+    def __init__(self, get_gemini_bot):
         super().__init__(name="admin", description="Admin commands for DuckBot setup.")
 
         # Initialise the database
         self.settings_db = AdminSettingsDB()
+        # Returns the gemini bot, or None if it has not been initialised yet
+        self.get_gemini_bot = get_gemini_bot
 
         # Add subgroups to the main admin group
         self.set = SetSubGroup(self.check_admin, self.settings_db)
-        self.reset = ResetSubGroup(self.check_admin, gemini_bot)
+        self.reset = ResetSubGroup(self.check_admin, get_gemini_bot)
 
         # Register subgroups
         self.add_command(self.set)
@@ -98,6 +108,127 @@ class AdminCommands(app_commands.Group):
 
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
+    @app_commands.command(
+        name="gemini-stats",
+        description="Display Gemini response cache, request queue and latency statistics.",
+    )
+    @require_admin(require_guild=False)
+    async def gemini_stats(self, interaction: Interaction):
+        """Command to display how effectively Gemini requests are being served."""
+        gemini_bot = self.get_gemini_bot()
+        if gemini_bot is None:
+            await interaction.response.send_message(
+                "Gemini has not been used since DuckBot started.", ephemeral=True
+            )
+            return
+
+        embed = Embed(title="Gemini Statistics", color=0x00FF00)
+        for name, stats in (
+            ("Response Cache", gemini_bot.response_cache.stats()),
+            ("Request Queue", gemini_bot.scheduler.stats()),
+            ("Time to First Token", gemini_bot.ttft_stats()),
+            ("Token Usage", dict(gemini_bot.token_usage)),
+        ):
+            value = "\n".join(f"{key}: `{val}`" for key, val in stats.items())
+            embed.add_field(name=name, value=value or "No requests yet", inline=False)
+
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @app_commands.command(
+        name="loop-stats",
+        description="Display event loop lag and how often the loop has been blocked.",
+    )
+    @require_admin(require_guild=False)
+    async def loop_stats(self, interaction: Interaction):
+        """Command to display how responsive DuckBot's event loop has been recently."""
+        if not LOOP_MONITOR_ENABLED:
+            await interaction.response.send_message(
+                "Event loop monitoring is disabled (LOOP_MONITOR_ENABLED=false).",
+                ephemeral=True,
+            )
+            return
+
+        stats = interaction.client.loop_monitor.stats()
+        embed = Embed(title="Event Loop Statistics", color=0x00FF00)
+        embed.description = "\n".join(f"{key}: `{val}`" for key, val in stats.items())
+
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @app_commands.command(
+        name="slow-queries",
+        description="Display the slowest database statements since DuckBot started.",
+    )
+    @app_commands.describe(
+        sort="Rank statements by their total (default), mean or max execution time.",
+        limit="How many statements to show.",
+    )
+    @app_commands.choices(
+        sort=[
+            app_commands.Choice(name="total", value="total"),
+            app_commands.Choice(name="mean", value="mean"),
+            app_commands.Choice(name="max", value="max"),
+        ]
+    )
+    @require_admin(require_guild=False)
+    async def slow_queries(
+        self,
+        interaction: Interaction,
+        sort: Optional[app_commands.Choice[str]] = None,
+        limit: app_commands.Range[int, 1, 25] = 10,
+    ):
+        """Command to display per-statement execution times, slowest first."""
+        if not SQL_STATS_ENABLED:
+            await interaction.response.send_message(
+                "Statement timing is disabled (SQL_STATS_ENABLED=false).",
+                ephemeral=True,
+            )
+            return
+
+        sort = sort.value if sort else "total"
+        embed = Embed(
+            title=f"Slowest Statements by {sort.title()} Time",
+            description=f"Statements over {SLOW_QUERY_MS:g} ms are logged with their query plan.",
+            color=0x00FF00,
+        )
+        for stats in get_slowest_statements(limit, sort):
+            embed.add_field(
+                name=f"{stats.statement} ({stats.database})",
+                value=(
+                    f"calls: `{stats.calls}` total: `{stats.total * 1000:.0f} ms` "
+                    f"mean: `{stats.mean * 1000:.2f} ms` max: `{stats.max * 1000:.2f} ms`\n"
+                    f"rows: `{stats.rows}` slow: `{stats.slow}`"
+                ),
+                inline=False,
+            )
+        if not embed.fields:
+            embed.description = "No statements have run yet."
+
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @app_commands.command(
+        name="sync-commands",
+        description="Sync DuckBot's slash commands with Discord, even if unchanged.",
+    )
+    @app_commands.describe(
+        this_server_only="Sync a copy to this server only, which applies instantly."
+    )
+    @require_admin(require_guild=False)
+    async def sync_commands(
+        self, interaction: Interaction, this_server_only: bool = False
+    ):
+        """Command to force a command tree sync, globally or to the current server."""
+        await interaction.response.defer(ephemeral=True)
+        tree = interaction.client.tree
+        guild = interaction.guild if this_server_only else None
+        if guild is not None:
+            tree.copy_global_to(guild=guild)
+        await interaction.client.command_sync.sync(tree, guild, force=True)
+
+        await interaction.followup.send(
+            f"Synced commands {'to this server' if guild else 'globally'}.",
+            ephemeral=True,
+        )
+
 
 class SetSubGroup(app_commands.Group):
     def __init__(self, check_admin, settings_db):
@@ -209,17 +340,51 @@ class SetSubGroup(app_commands.Group):
 
 
 class ResetSubGroup(app_commands.Group):
-    def __init__(self, check_admin, gemini_bot):
+    def __init__(self, check_admin, get_gemini_bot):
         super().__init__(name="reset", description="Reset specific DuckBot settings.")
         self.check_admin = check_admin
-        self.gemini_bot = gemini_bot
+        self.get_gemini_bot = get_gemini_bot
 
     @app_commands.command(name="chat-history", description="Reset Gemini chat history.")
+    @app_commands.describe(
+        this_channel_only="Only reset the history of the current channel or thread."
+    )
     @require_admin(require_guild=False)
-    async def reset_chat_history(self, interaction: Interaction):
-        # Call the method to reset Gemini chat history
-        self.gemini_bot.clear_chat_history()
+    async def reset_chat_history(
+        self, interaction: Interaction, this_channel_only: bool = False
+    ):
+        # Call the method to reset Gemini chat history (there is none before first use)
+        gemini_bot = self.get_gemini_bot()
+        if gemini_bot is not None:
+            gemini_bot.clear_chat_history(
+                interaction.channel_id if this_channel_only else None
+            )
 
         await interaction.response.send_message(
             "Gemini chat history has been reset.", ephemeral=True
         )
+
+    @app_commands.command(
+        name="response-cache", description="Clear cached Gemini responses."
+    )
+    @require_admin(require_guild=False)
+    async def reset_response_cache(self, interaction: Interaction):
+        gemini_bot = self.get_gemini_bot()
+        if gemini_bot is not None:
+            gemini_bot.response_cache.clear()
+
+        await interaction.response.send_message(
+            "Gemini response cache has been cleared.", ephemeral=True
+        )
+
+    @app_commands.command(
+        name="sql-stats",
+        description="Clear the statement timings of /admin slow-queries.",
+    )
+    @require_admin(require_guild=False)
+    async def reset_sql_stats(self, interaction: Interaction):
+        reset_statement_stats()
+
+        await interaction.response.send_message(
+            "Statement timings have been cleared.", ephemeral=True
+        )
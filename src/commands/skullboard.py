@@ -26,11 +26,18 @@ from constants.colours import LIGHT_GREY
 from models.databases.admin_settings_db import AdminSettingsDB
 from models.databases.skullboard_database import SkullboardDB
 from utils import time
+from utils.metrics import registry
 from utils.plotting import get_histogram_image
 
 load_dotenv()
 KLIPY_API_KEY = os.getenv("KLIPY_API_KEY")
 
+SKULLBOARD_UPDATES = registry.counter(
+    "duckbot_skullboard_updates_total",
+    "Skullboard messages sent, edited or deleted",
+    ("action",),
+)
+
 
 def _get_guild_id(interaction: Interaction):
     """Return the guild id from an interaction (or None)."""
@@ -106,7 +113,7 @@ class SkullboardManager:
         skullboard_message_id = None
         message_jump_url = message.jump_url
 
-        message_time = time.get_day_from_timestamp(message.created_at)
+        message_time = time.get_day_from_snowflake(message.id)
         message_id = message.id
         channel_id = message.channel.id
         author_id = message.author.id
@@ -115,9 +122,8 @@ class SkullboardManager:
             await self.db.update_skull_post(
                 message_id, author_id, channel_id, message_time, current_count, guild_id
             )
-        except Exception as e:
-            print("Could not update skull post for ", message_id)
-            print("Error:", e)
+        except Exception:
+            logging.exception(f"Could not update skull post for {message_id}")
 
         async for skullboard_message in channel.history(limit=100):
             if message_jump_url in skullboard_message.content:
@@ -141,6 +147,7 @@ class SkullboardManager:
         elif skullboard_message_id:
             skullboard_message = await channel.fetch_message(skullboard_message_id)
             await skullboard_message.delete()
+            SKULLBOARD_UPDATES.labels("deleted").inc()
 
     @staticmethod
     def _simplify(url: str) -> str:
@@ -153,8 +160,9 @@ class SkullboardManager:
         url = SkullboardManager._simplify(url.casefold())
         for prefix in ("klipy.com/gif/", "klipy.com/gifs/"):
             if url.startswith(prefix):
-                print(url.replace(prefix, "").split("/")[0])
-                return url.replace(prefix, "").split("/")[0]
+                gif_id = url.replace(prefix, "").split("/")[0]
+                logging.debug(f"Klipy GIF id {gif_id}")
+                return gif_id
         return None
 
     @staticmethod
@@ -274,9 +282,11 @@ class SkullboardManager:
         # Determine if sending or editing the message
         if send:
             await channel.send(message_content, embed=embed)
+            SKULLBOARD_UPDATES.labels("sent").inc()
         else:
             skullboard_message = await channel.fetch_message(skullboard_message_id)
             await skullboard_message.edit(content=message_content, embed=embed)
+            SKULLBOARD_UPDATES.labels("edited").inc()
 
     async def rebuild_reactor_totals(
         self, messages_per_page: int = 100, page_delay: float = 1.0
@@ -356,10 +366,12 @@ class SkullboardManager:
 
                     # msgs come newest-first; we'll process them in the order returned
                     # and use the oldest message in the page as the next `before` marker
+                    week_ago = time.get_current_day() - 7
                     for message in msgs:
                         # Only look for skull reactions on messages
                         if not getattr(message, "reactions", None):
                             continue
+                        message_day = time.get_day_from_snowflake(message.id)
 
                         for reaction in message.reactions:
                             try:
@@ -376,10 +388,7 @@ class SkullboardManager:
                                             # For older messages, increment the long-term
                                             # `reactors` aggregate directly so `reactor_posts` stays
                                             # temporary-only.
-                                            message_day = time.get_day_from_timestamp(
-                                                message.created_at
-                                            )
-                                            if time.get_current_day() - 7 < message_day:
+                                            if week_ago < message_day:
                                                 await self.db.add_reactor_post(
                                                     message.id, user.id, guild_id_str
                                                 )
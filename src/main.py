@@ -1,8 +1,11 @@
+from utils.startup_profiler import profiler  # isort: skip
+
 import asyncio
 import importlib
 import logging
 import os
 import pkgutil
+from datetime import datetime, timezone
 
 from discord import (
     Attachment,
@@ -10,6 +13,7 @@ from discord import (
     Intents,
     Interaction,
     Message,
+    Object,
     RawReactionActionEvent,
     app_commands,
 )
@@ -20,8 +24,17 @@ from dotenv import load_dotenv
 from commands import admin_commands, gemini, help_menu, skullboard, ticketing
 from constants.colours import LIGHT_YELLOW
 from models.databases.admin_settings_db import AdminSettingsDB
-from utils import spam_detection, time
+from models.databases.gemini_files_database import GeminiFilesDB
+from models.databases.rate_limit_database import RateLimitDB
+from utils import cms, spam_detection, time
+from utils.command_sync import CommandSyncManager
 from utils.event_roles import EventRoleManager
+from utils.log_pipeline import pipeline as log_pipeline
+from utils.loop_monitor import LOOP_MONITOR_ENABLED, LoopMonitor
+from utils.metrics import registry
+from utils.scheduler import Scheduler, daily_at, every
+
+profiler.mark("imports")
 
 # Load environment variables from .env file
 load_dotenv()
@@ -30,8 +43,22 @@ load_dotenv()
 BOT_TOKEN = os.environ["BOT_TOKEN"]
 KLIPY_API_KEY = os.environ.get("KLIPY_API_KEY", "")
 GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY", "")
+# Build the Gemini subsystem in the background once connected, rather than on the first query
+GEMINI_WARMUP = os.environ.get("GEMINI_WARMUP", "true").lower() == "true"
+# Sync commands to this guild only (instant, for development) instead of globally
+DEV_GUILD_ID = os.environ.get("DEV_GUILD_ID", "")
+# Sync even if the command tree is unchanged since the last sync
+FORCE_COMMAND_SYNC = os.environ.get("FORCE_COMMAND_SYNC", "false").lower() == "true"
 SPAM_CHECK_MIN_MSG = 3
 MESSAGE_HISTORY_LIMIT = 1000
+REACTION_EVENTS = registry.counter(
+    "duckbot_reaction_events_total", "Skull reaction events received", ("action",)
+)
+GEMINI_DISABLED_EMBED = Embed(
+    title="Ask DuckBot",
+    description="DuckBot's Gemini integration is not configured.",
+    color=LIGHT_YELLOW,
+)
 
 # Load the permissions the bot has been granted in the previous configuration
 intents = Intents.default()
@@ -58,40 +85,69 @@ class DuckBot(commands.Bot):
     def __init__(self):
         super().__init__(command_prefix="", intents=intents)
         self.synced = False  # Make sure that the command tree will be synced only once
+        self.command_sync = CommandSyncManager()
         self.skullboard_manager = skullboard.SkullboardManager(
             self
         )  # Initialise SkullboardManager
         self.event_role_manager = EventRoleManager(self)  # Initialise EventRoleManager
         self.admin_db = AdminSettingsDB()
-        self.prev_day = None
-        self.expiry_loop = None
+        # Shared database handles, opened in setup_hook and closed on shutdown
+        self.databases = [
+            self.admin_db,
+            self.skullboard_manager.db,
+            RateLimitDB(),
+            GeminiFilesDB(),
+        ]
+        self.scheduler = Scheduler()
+        self.loop_monitor = LoopMonitor()
         self.reactor_scan_done = False
 
-        # logging
-        logging.basicConfig(
-            filename="DuckBot.log",  # Log file name
-            format="%(asctime)s %(levelname)-8s %(message)s",
-            datefmt="%Y-%m-%d %H:%M:%S",
-            level=logging.INFO,  # Minimum log level to capture
-        )
+        # logging, written to the rotating log file by a background thread
+        log_pipeline.start()
         logging.info("Started Bot")
 
-        # Initialise gemini model
-        self.gemini_model = gemini.GeminiBot(
-            model_name="models/gemini-3.5-flash",
-            data_csv_path="src/data/duckbot_train_data.csv",
-            bot=self,
-            api_key=GEMINI_API_KEY,
-        )
+        # The gemini model is built on first use (see get_gemini_model)
+        self.gemini_model = None
+        self.gemini_lock = asyncio.Lock()
 
-        self.admin_commands = admin_commands.AdminCommands(gemini_bot=self.gemini_model)
+        self.admin_commands = admin_commands.AdminCommands(
+            get_gemini_bot=lambda: self.gemini_model
+        )
         # Check if admin commands are already registered before adding
         if not any(
             cmd.name == self.admin_commands.name for cmd in self.tree.get_commands()
         ):
             self.tree.add_command(self.admin_commands)
 
+    async def get_gemini_model(self):
+        """Return the gemini model, building it on first use. Returns None if Gemini is not configured."""
+        if self.gemini_model is None and GEMINI_API_KEY:
+            async with self.gemini_lock:
+                if self.gemini_model is None:
+                    # Building parses the FAQ csv and opens databases, so keep it off the event loop
+                    self.gemini_model = await asyncio.to_thread(
+                        gemini.GeminiBot,
+                        model_name="models/gemini-3.5-flash",
+                        data_csv_path="src/data/duckbot_train_data.csv",
+                        bot=self,
+                        api_key=GEMINI_API_KEY,
+                    )
+                    logging.info("GEMINI: Initialised gemini model")
+        return self.gemini_model
+
+    async def warm_up_gemini(self):
+        """Build the gemini model ahead of the first query."""
+        try:
+            await self.get_gemini_model()
+        except Exception:
+            logging.exception("GEMINI: Failed to warm up gemini model")
+
     async def setup_hook(self):
+        profiler.mark("login")
+        if LOOP_MONITOR_ENABLED:
+            self.loop_monitor.start()
+        await asyncio.gather(*(db.open() for db in self.databases))
+        profiler.mark("open databases")
         # Dynamically load all command groups from the commands directory
         for _, module_name, _ in pkgutil.iter_modules(["src/commands"]):
             module = importlib.import_module(f"commands.{module_name}")
@@ -103,14 +159,74 @@ class DuckBot(commands.Bot):
                         cmd.name == attribute.name for cmd in self.tree.get_commands()
                     ):
                         self.tree.add_command(attribute)
+        profiler.mark("load command modules")
         if not self.synced:  # Check if slash commands have been synced
-            await self.tree.sync()
+            guild = None
+            if DEV_GUILD_ID:
+                guild = Object(id=int(DEV_GUILD_ID))
+                self.tree.copy_global_to(guild=guild)
+            # Skipped when the tree matches the last sync, as syncing is slow and rate limited
+            await self.command_sync.sync(self.tree, guild, force=FORCE_COMMAND_SYNC)
             self.synced = True
-        self.loop.create_task(self.run_expiry_loop())
+        profiler.mark("sync command tree")
+        try:
+            await registry.start_server()
+        except OSError as e:
+            # Metrics are optional, e.g. the port may already be in use
+            logging.error(
+                f"Failed to start the metrics server, continuing without it: {e}"
+            )
+        self.schedule_jobs()
         self.add_view(ticketing.TicketPanel())
 
+    def schedule_jobs(self):
+        # Expire skullboard data as each day begins, catching up on start
+        self.scheduler.add_job(
+            "skullboard expiry",
+            self.expire_skullboard,
+            next_run=time.get_next_day_start,
+            run_immediately=True,
+        )
+        # Refresh the CMS data in the early morning, before anyone asks about it
+        self.scheduler.add_job(
+            "cms refresh",
+            lambda: asyncio.to_thread(cms.refresh_cache),
+            next_run=daily_at(4),
+            jitter=600,
+        )
+        self.scheduler.add_job(
+            "gemini cache pruning", self.prune_gemini_caches, next_run=every(3600)
+        )
+        self.scheduler.start()
+
+    async def expire_skullboard(self):
+        await self.skullboard_manager.db.expire()
+        logging.info(f"Expired old data {time.get_current_day()}")
+
+    async def prune_gemini_caches(self):
+        if self.gemini_model is None:
+            return
+        self.gemini_model.response_cache.prune()
+        await self.gemini_model.file_index.delete_expired(
+            datetime.now(timezone.utc).timestamp()
+        )
+
+    async def close(self):
+        await self.scheduler.stop()
+        await self.loop_monitor.stop()
+        await super().close()
+        await registry.stop_server()
+        for db in self.databases:
+            try:
+                await db.close()
+            except Exception:
+                logging.exception(f"Failed to close {db.__class__.__name__}")
+
     async def on_ready(self):
         print(f"Say hi to {self.user}!")
+        if not profiler.reported:
+            profiler.mark("ready")
+            profiler.log_report()
         # Kick off a one-time historical reactor scan to populate reactor totals
         if not self.reactor_scan_done:
             try:
@@ -118,6 +234,8 @@ class DuckBot(commands.Bot):
                 self.reactor_scan_done = True
             except Exception:
                 logging.exception("Failed to start reactor rebuild task")
+        if GEMINI_WARMUP and self.gemini_model is None:
+            self.loop.create_task(self.warm_up_gemini())
 
     # Override on_message method with correct parameters
     async def on_message(self, message):
@@ -126,6 +244,7 @@ class DuckBot(commands.Bot):
     # Register the reaction handling
     async def on_raw_reaction_add(self, payload: RawReactionActionEvent):
         if payload.emoji.name == "💀":
+            REACTION_EVENTS.labels("add").inc()
             channel = self.get_channel(payload.channel_id)
             if not channel:
                 try:
@@ -157,7 +276,7 @@ class DuckBot(commands.Bot):
                     # payload.user_id is the ID of the user who reacted
                     if getattr(payload, "user_id", None) is not None:
                         # Only track reactor posts for messages within the 7-day tracking window
-                        message_day = time.get_day_from_timestamp(message.created_at)
+                        message_day = time.get_day_from_snowflake(payload.message_id)
                         if time.get_current_day() - 7 < message_day:
                             await self.skullboard_manager.db.add_reactor_post(
                                 payload.message_id, payload.user_id, str(guild_id)
@@ -171,6 +290,7 @@ class DuckBot(commands.Bot):
 
     async def on_raw_reaction_remove(self, payload: RawReactionActionEvent):
         if payload.emoji.name == "💀":
+            REACTION_EVENTS.labels("remove").inc()
             channel = self.get_channel(payload.channel_id)
             if not channel:
                 try:
@@ -200,7 +320,7 @@ class DuckBot(commands.Bot):
                 try:
                     if getattr(payload, "user_id", None) is not None:
                         # Only modify reactor_posts for messages within the 7-day tracking window
-                        message_day = time.get_day_from_timestamp(message.created_at)
+                        message_day = time.get_day_from_snowflake(payload.message_id)
                         if time.get_current_day() - 7 < message_day:
                             await self.skullboard_manager.db.remove_reactor_post(
                                 payload.message_id, payload.user_id, str(guild_id)
@@ -212,18 +332,9 @@ class DuckBot(commands.Bot):
                     message, channel_id, str(guild_id), required
                 )
 
-    async def run_expiry_loop(self):
-        """runs every minute checking for expiration"""
-        while True:
-            curr = time.get_current_day()
-            if self.prev_day != curr:
-                await self.skullboard_manager.db.expire()
-                logging.info(f"Expired old data {curr}")
-                self.prev_day = curr
-            await asyncio.sleep(60)  # Wait 1 minute
-
 
 client = DuckBot()
+profiler.mark("init")
 
 
 @client.tree.command(description="Pong!")
@@ -236,13 +347,26 @@ async def chat(interaction: Interaction, query: str | None, file: Attachment | N
     try:
         await interaction.response.defer()
         query = "" if query is None else query
-        bot_response = await client.gemini_model.query(
+        # Stream long answers into the followup message as they are generated
+        reply = gemini.StreamedReply(
+            lambda embeds: interaction.followup.send(embeds=embeds, wait=True)
+        )
+        gemini_model = await client.get_gemini_model()
+        if gemini_model is None:
+            await interaction.followup.send(embed=GEMINI_DISABLED_EMBED)
+            return
+        bot_response = await gemini_model.query(
             message=query,
             attachment=file,
             author=interaction.user.display_name,
             author_id=interaction.user.id,
+            on_embeds=reply.update,
+            conversation_id=(interaction.channel_id, interaction.user.id),
+            guild=interaction.guild,
+            # Slash commands have a deferred interaction waiting, so serve them first
+            priority=gemini.Priority.COMMAND,
         )
-        await interaction.followup.send(embeds=bot_response)
+        await reply.update(bot_response)
 
     except NotFound as e:
         """
@@ -305,16 +429,28 @@ async def on_message(message: Message):
     ):
         attachment = message.attachments[0] if message.attachments else None
 
-        bot_response = await client.gemini_model.query(
+        # Stream long answers into the reply as they are generated
+        reply = gemini.StreamedReply(
+            lambda embeds: message.reply(embeds=embeds, mention_author=False)
+        )
+        gemini_model = await client.get_gemini_model()
+        if gemini_model is None:
+            await message.reply(embed=GEMINI_DISABLED_EMBED, mention_author=False)
+            return
+        bot_response = await gemini_model.query(
             author_id=message.author.id,
             author=message.author.display_name,
             message=message.content.replace("d.chat", "")
             .replace(f"<@{client.user.id}>", "")
             .strip(),
             attachment=attachment,
+            on_embeds=reply.update,
+            conversation_id=(message.channel.id, message.author.id),
+            guild=message.guild,
         )
-        await message.reply(embeds=bot_response, mention_author=False)
+        await reply.update(bot_response)
 
 
-# Add the token of bot
-client.run(BOT_TOKEN)
+if __name__ == "__main__":
+    # Add the token of bot
+    client.run(BOT_TOKEN)
@@ -1,10 +1,30 @@
 import asyncio
 import logging
+import os
+import sqlite3
+import time
 from functools import wraps
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 
 import aiosqlite
+from dotenv import load_dotenv
+
+from utils.metrics import registry
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Record the time and rows of each statement for /admin slow-queries
+SQL_STATS_ENABLED = os.environ.get("SQL_STATS_ENABLED", "true").lower() == "true"
+# Statements slower than this are logged with their query plan
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", "200"))
+
+DB_QUERY_SECONDS = registry.histogram(
+    "duckbot_db_query_seconds",
+    "Time to execute and commit a SQLite statement",
+    ("database", "statement"),
+)
 
 
 def get_db_folder():
@@ -14,20 +34,128 @@ def get_db_folder():
     return db_dir
 
 
+def get_statement_names(schema: type) -> dict[str, str]:
+    """Map each SQL statement in a schema class to its name, e.g. "SkullSQL.histogram_7"."""
+    names = {}
+    for attribute, value in vars(schema).items():
+        if attribute.startswith("__"):
+            continue
+        if isinstance(value, str):
+            names[value] = f"{schema.__name__}.{attribute}"
+        elif isinstance(value, list):
+            # Lists may group statements that also have their own name, which wins
+            for i, statement in enumerate(value):
+                if isinstance(statement, str):
+                    names.setdefault(statement, f"{schema.__name__}.{attribute}[{i}]")
+    return names
+
+
+class StatementStats:
+    """Running totals for one named statement of one Database."""
+
+    __slots__ = (
+        "database",
+        "statement",
+        "calls",
+        "total",
+        "max",
+        "rows",
+        "slow",
+        "plan",
+    )
+
+    def __init__(self, database: str, statement: str):
+        self.database = database
+        self.statement = statement
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.slow = 0
+        # EXPLAIN QUERY PLAN output, captured the first time the statement is slow
+        self.plan: Optional[str] = None
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.calls if self.calls else 0.0
+
+
+# Keyed by (database name, statement name)
+statement_stats: dict[tuple[str, str], StatementStats] = {}
+
+
+def get_slowest_statements(
+    limit: int = 10, sort: str = "total"
+) -> list[StatementStats]:
+    """Return the statements with the highest total, mean or max execution time."""
+    keys = {
+        "total": lambda stats: stats.total,
+        "mean": lambda stats: stats.mean,
+        "max": lambda stats: stats.max,
+    }
+    return sorted(statement_stats.values(), key=keys[sort], reverse=True)[:limit]
+
+
+def reset_statement_stats():
+    statement_stats.clear()
+
+
 class Database:
-    """A wrapper for a SQLite Database"""
+    """A wrapper for a SQLite Database, sharing one connection between all statements"""
 
     def __init__(
-        self, commands: List[str], db_name: str, db_folder: Path = get_db_folder()
+        self,
+        commands: List[str],
+        db_name: str,
+        db_folder: Optional[Path] = None,
+        schema: Optional[type] = None,
     ):
-        """Initialise the SQLite Database. must include .sqlite file extension in Database name"""
-        path = db_folder / db_name
-        path.touch(exist_ok=True)  # create if Database does not exist
+        """Prepare the SQLite Database. must include .sqlite file extension in Database name.
+        The Database is created and initialised by open(), which execute() awaits if needed.
+        Statements from the `schema` class are reported by name in metrics."""
+        path = (db_folder or get_db_folder()) / db_name
         self.db_path = path.resolve()
         self.name = db_name
-        asyncio.run(
-            self.initialise_database(commands)
-        )  # Catastrophic error: will crash if initialise_Database fails
+        self.commands = commands
+        self.statement_names = get_statement_names(schema) if schema else {}
+        self.connection: Optional[aiosqlite.Connection] = None
+        self.lock = asyncio.Lock()
+        # Set by close(), so statements still running at shutdown don't reopen it
+        self.closed = False
+
+    async def open(self):
+        """Connect to the Database and initialise it, if not already open.
+        Catastrophic error: raises if initialise_database fails"""
+        async with self.lock:
+            self.closed = False
+            await self._connect()
+
+    async def _connect(self):
+        """Open the connection if needed. Called while holding the lock."""
+        if self.connection is not None:
+            return
+        self.connection = await aiosqlite.connect(self.db_path)
+        try:
+            await self.initialise_database(self.commands)
+        except Exception:
+            await self.connection.close()
+            self.connection = None
+            raise
+
+    async def close(self):
+        """Close the Database connection, if open. Later statements raise until open() is called again."""
+        async with self.lock:
+            self.closed = True
+            if self.connection is not None:
+                await self.connection.close()
+                self.connection = None
+
+    def statement_name(self, sql: str) -> str:
+        """Return the schema name of a statement, or its leading keyword if it has none."""
+        name = self.statement_names.get(sql)
+        if name is None:
+            name = f"{self.name}:{sql.split(None, 1)[0].upper() if sql.strip() else ''}"
+        return name
 
     def crash_handler(func):
         """Decorator to handle crashes in async functions by logging exceptions and returning None."""
@@ -55,11 +183,19 @@ class Database:
         Parameters are used for (?) values in SQL statements.
         May choose to retrieve data from query, and whether to return one or all rows (fetch= "none" | "one" | "all").
 
-        Execute() raises an error when there is a databse error. In most cases, this should be handled by crash_handler.
+        Execute() raises an error when there is a databse error, or the Database has been closed.
+        In most cases, this should be handled by crash_handler.
         """
-        async with aiosqlite.connect(self.db_path) as db:
+        name = self.statement_name(sql)
+        # Statements share the connection, so run each one and its commit as a unit
+        async with self.lock:
+            if self.closed:
+                raise sqlite3.ProgrammingError(f"Database {self.name} is closed")
+            await self._connect()
+            db = self.connection
             async with db.cursor() as cursor:
                 try:
+                    start = time.perf_counter()
                     if parameters:
                         await cursor.execute(sql, parameters)
                     else:
@@ -67,12 +203,22 @@ class Database:
 
                     if fetch == "one":
                         result = await cursor.fetchone()
+                        rows = int(result is not None)
                     elif fetch == "all":
                         result = await cursor.fetchall()
+                        rows = len(result)
                     else:
                         result = None
+                        # -1 for statements that don't modify rows
+                        rows = max(cursor.rowcount, 0)
 
                     await db.commit()
+                    elapsed = time.perf_counter() - start
+                    DB_QUERY_SECONDS.labels(self.name, name).observe(elapsed)
+                    if SQL_STATS_ENABLED:
+                        await self.record_statement(
+                            name, sql, parameters, elapsed, rows
+                        )
                     return result
 
                 except Exception:
@@ -80,17 +226,57 @@ class Database:
                     await db.rollback()
                     raise  # Re-raise the exception after logging
 
+    async def record_statement(
+        self, name: str, sql: str, parameters, elapsed: float, rows: int
+    ):
+        """Add a statement's execution to its stats, logging it with its query plan if slow.
+        Called while holding the lock."""
+        stats = statement_stats.get((self.name, name))
+        if stats is None:
+            stats = statement_stats[(self.name, name)] = StatementStats(self.name, name)
+        stats.calls += 1
+        stats.total += elapsed
+        stats.max = max(stats.max, elapsed)
+        stats.rows += rows
+        if elapsed * 1000 < SLOW_QUERY_MS:
+            return
+
+        stats.slow += 1
+        if stats.plan is None:
+            stats.plan = await self.explain(sql, parameters)
+        logging.warning(
+            f"Slow SQLite statement {name} on {self.name}: {elapsed * 1000:.1f} ms, "
+            f"{rows} rows (slow {stats.slow} of {stats.calls} calls)\nQuery plan:\n{stats.plan}"
+        )
+
+    async def explain(self, sql: str, parameters=None) -> str:
+        """Return the EXPLAIN QUERY PLAN output for a statement, as an indented tree."""
+        try:
+            async with self.connection.execute(
+                f"EXPLAIN QUERY PLAN {sql}", parameters or ()
+            ) as cursor:
+                plan = await cursor.fetchall()
+        except Exception as e:
+            return f"(unavailable: {e})"
+
+        depths = {0: -1}
+        lines = []
+        for node_id, parent_id, _, detail in plan:
+            depths[node_id] = depths.get(parent_id, -1) + 1
+            lines.append(f"{'  ' * depths[node_id]}{detail}")
+        return "\n".join(lines) or "(no plan)"
+
     async def initialise_database(self, sql_list: List[str]):
         """List of commands to initialise Database with. Cannot return any values"""
-        async with aiosqlite.connect(self.db_path) as db:
-            try:
-                for sql in sql_list:
-                    await db.execute(sql)
-                await db.commit()
-                print("Successfully Initialised", self.name)
+        db = self.connection
+        try:
+            for sql in sql_list:
+                await db.execute(sql)
+            await db.commit()
+            print("Successfully Initialised", self.name)
 
-            except Exception:
-                logging.exception(f"Database Initialisation for {self.name}")
-                await db.rollback()
-                raise  # Re-raise the exception after logging
-            return
+        except Exception:
+            logging.exception(f"Database Initialisation for {self.name}")
+            await db.rollback()
+            raise  # Re-raise the exception after logging
+        return
@@ -5,15 +5,44 @@ from models.schema.admin_settings_sql import AdminSettingsSQL
 
 
 class AdminSettingsDB:
+    """Singleton class for the admin settings database"""
+
+    _instance = None
+
+    def __new__(cls, *args, **kwargs):
+        """A new instance points to the original instance, if it exists"""
+        if not cls._instance:
+            cls._instance = super(AdminSettingsDB, cls).__new__(cls)
+        return cls._instance
+
     def __init__(self, db_path: str = "db/admin_settings.db"):
+        # Initialise ONCE
+        if hasattr(self, "initialised"):
+            return
         # Ensure the data directory exists
         Path(db_path).parent.mkdir(parents=True, exist_ok=True)
 
         self.db_path = db_path
-        self.init_db()
+        self.conn = None
+        self.initialised = True
+
+    async def open(self):
+        """Open the shared connection and initialise the tables, if not already open"""
+        self.get_db_connection()
+
+    async def close(self):
+        """Close the shared connection, if open"""
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
 
     def get_db_connection(self):
-        return sqlite3.connect(self.db_path)
+        """Return the shared connection, opening it on first use.
+        Settings are read on the event loop, where a single small sqlite query is cheap."""
+        if self.conn is None:
+            self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self.init_db()
+        return self.conn
 
     def init_db(self):
         """Initialise the database with tables and default values from .env"""
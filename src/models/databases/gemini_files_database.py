@@ -0,0 +1,45 @@
+from models.database import Database
+from models.schema.gemini_files_sql import GeminiFilesSQL
+
+
+class GeminiFilesDB(Database):
+    """Singleton class for the Gemini file upload index Database"""
+
+    _instance = None
+
+    def __new__(cls, *args, **kwargs):
+        """A new instance points to the original instance, if it exists"""
+        if not cls._instance:
+            cls._instance = super(GeminiFilesDB, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        """Initialise the Gemini files Database with tables"""
+        # Initialise ONCE
+        if not hasattr(self, "initialised"):
+            super().__init__(
+                GeminiFilesSQL.initialisation_tables,
+                "gemini_files.sqlite",
+                schema=GeminiFilesSQL,
+            )
+            self.initialised = True
+
+    @Database.crash_handler
+    async def get_file(self, sha256: str):
+        """Returns (name, uri, mimeType, expiresAt) of the file uploaded for a content hash, or None"""
+        sql = GeminiFilesSQL.get_file
+        return await self.execute(sql, (sha256,), "one")
+
+    @Database.crash_handler
+    async def add_file(
+        self, sha256: str, name: str, uri: str, mime_type: str, expires_at: float
+    ):
+        """Record the file a content hash was uploaded as"""
+        sql = GeminiFilesSQL.upsert_file
+        return await self.execute(sql, (sha256, name, uri, mime_type, expires_at))
+
+    @Database.crash_handler
+    async def delete_expired(self, now: float):
+        """Remove files that expired at or before `now`"""
+        sql = GeminiFilesSQL.delete_expired
+        return await self.execute(sql, (now,))
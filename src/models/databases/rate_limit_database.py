@@ -0,0 +1,43 @@
+from models.database import Database
+from models.schema.rate_limit_sql import RateLimitSQL
+
+
+class RateLimitDB(Database):
+    """Singleton class for the rate limit Database"""
+
+    _instance = None
+
+    def __new__(cls, *args, **kwargs):
+        """A new instance points to the original instance, if it exists"""
+        if not cls._instance:
+            cls._instance = super(RateLimitDB, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        """Initialise the rate limit Database with tables"""
+        # Initialise ONCE
+        if not hasattr(self, "initialised"):
+            super().__init__(
+                RateLimitSQL.initialisation_tables,
+                "rate_limits.sqlite",
+                schema=RateLimitSQL,
+            )
+            self.initialised = True
+
+    @Database.crash_handler
+    async def add_request(self, scope: str, user_id, timestamp: float):
+        """Record an accepted request for a user"""
+        sql = RateLimitSQL.insert_request
+        return await self.execute(sql, (scope, user_id, timestamp))
+
+    @Database.crash_handler
+    async def get_requests_since(self, scope: str, since: float):
+        """Returns (userId, timestamp) rows for requests made after `since`, oldest first"""
+        sql = RateLimitSQL.requests_since
+        return await self.execute(sql, (scope, since), "all")
+
+    @Database.crash_handler
+    async def delete_requests_before(self, scope: str, before: float):
+        """Remove requests made at or before `before`"""
+        sql = RateLimitSQL.delete_requests_before
+        return await self.execute(sql, (scope, before))
@@ -21,7 +21,9 @@ class SkullboardDB(Database):
         if not hasattr(self, "initialised"):
             # Use admin settings DB to fetch per-guild thresholds when needed
             self.admin_db = AdminSettingsDB()
-            super().__init__(SkullSQL.initialisation_tables, "skull.sqlite")
+            super().__init__(
+                SkullSQL.initialisation_tables, "skull.sqlite", schema=SkullSQL
+            )
             self.initialised = True
 
     @Database.crash_handler
@@ -0,0 +1,32 @@
+class GeminiFilesSQL:
+    """Store SQL statements for the Gemini file upload index.
+    Each variable is named after the function or functionality associated with the statements.
+    """
+
+    """Initialise the Gemini files database's tables.
+    (files) maps the SHA-256 of an attachment's bytes to the Gemini file it was uploaded as."""
+    initialisation_tables = [
+        """CREATE TABLE IF NOT EXISTS files (
+    sha256 TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    uri TEXT NOT NULL,
+    mimeType TEXT,
+    expiresAt REAL NOT NULL
+    );""",
+    ]
+
+    """Get the uploaded file for a content hash."""
+    get_file = """
+    SELECT name, uri, mimeType, expiresAt FROM files WHERE sha256 = ?;
+    """
+
+    """Record (or replace) the uploaded file for a content hash."""
+    upsert_file = """
+    INSERT OR REPLACE INTO files (sha256, name, uri, mimeType, expiresAt)
+    VALUES (?, ?, ?, ?, ?);
+    """
+
+    """Remove files that Gemini has already deleted."""
+    delete_expired = """
+    DELETE FROM files WHERE expiresAt <= ?;
+    """
@@ -0,0 +1,33 @@
+class RateLimitSQL:
+    """Store SQL statements for the rate limiter functionalities.
+    Each variable is named after the function or functionality associated with the statements.
+    """
+
+    """Initialise the rate limit database's tables.
+    (requests) stores the time of every accepted request within the longest window, per limiter scope."""
+    initialisation_tables = [
+        """CREATE TABLE IF NOT EXISTS requests (
+    scope TEXT,
+    userId INTEGER,
+    timestamp REAL
+    );""",
+        """CREATE INDEX IF NOT EXISTS requests_scope_timestamp
+    ON requests (scope, timestamp);""",
+    ]
+
+    """Record an accepted request."""
+    insert_request = """
+    INSERT INTO requests (scope, userId, timestamp) VALUES (?, ?, ?);
+    """
+
+    """Get all requests for a scope made after a given time, oldest first."""
+    requests_since = """
+    SELECT userId, timestamp FROM requests
+    WHERE scope = ? AND timestamp > ?
+    ORDER BY timestamp ASC;
+    """
+
+    """Remove requests for a scope that are older than every window."""
+    delete_requests_before = """
+    DELETE FROM requests WHERE scope = ? AND timestamp <= ?;
+    """
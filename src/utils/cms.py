@@ -5,6 +5,7 @@ from zoneinfo import ZoneInfo
 import requests
 
 from utils import cms_helpers
+from utils.metrics import registry
 
 BASE_CMS_URL = "https://cms.csclub.org.au/api"
 CACHE_TTL = 86400  # 1 day
@@ -14,9 +15,21 @@ COMMITTEE_ENDPOINT = "committee-members"
 PROJECTS_ENDPOINT = "projects"
 SPONSORS_ENDPOINT = "sponsors"
 COMMON_EVENTS_ENDPOINT = "common-events"
+# Size of the page of past events the Gemini context is built from
+RAG_PAST_EVENTS_LIMIT = 50
+
+CMS_CACHE_LOOKUPS = registry.counter(
+    "duckbot_cms_cache_lookups_total",
+    "CMS cache lookups by endpoint and result (hit, fetched, stale or missing)",
+    ("endpoint", "result"),
+)
+CMS_FETCH_SECONDS = registry.histogram(
+    "duckbot_cms_fetch_seconds", "Time taken by CMS requests", ("endpoint",)
+)
 
 _memory_cache = {}
 _cache_times = {}
+_cache_versions = {}
 
 
 def _fetch_from_cms(
@@ -51,21 +64,46 @@ def _get_cached(
     now = datetime.now(timezone.utc)
     if not force and cache_key in _memory_cache and cache_key in _cache_times:
         if (now - _cache_times[cache_key]).total_seconds() < CACHE_TTL:
+            CMS_CACHE_LOOKUPS.labels(endpoint, "hit").inc()
             return _memory_cache[cache_key]
 
-    resp = _fetch_from_cms(endpoint, params=params)
+    with CMS_FETCH_SECONDS.labels(endpoint).time():
+        resp = _fetch_from_cms(endpoint, params=params)
     if resp is not None:
         _memory_cache[cache_key] = resp
         _cache_times[cache_key] = now
+        _cache_versions[cache_key] = _cache_versions.get(cache_key, 0) + 1
+        CMS_CACHE_LOOKUPS.labels(endpoint, "fetched").inc()
         return resp
 
     # Fallback to stale cache on failure
     if cache_key in _memory_cache:
+        CMS_CACHE_LOOKUPS.labels(endpoint, "stale").inc()
         return _memory_cache[cache_key]
 
+    CMS_CACHE_LOOKUPS.labels(endpoint, "missing").inc()
     return None
 
 
+def get_cache_version(cache_key: str) -> int:
+    """Return how many times `cache_key` has been refreshed from the CMS (0 if never fetched)."""
+    return _cache_versions.get(cache_key, 0)
+
+
+def is_cache_stale(cache_key: str) -> bool:
+    """Return True if `cache_key` has never been fetched or is older than CACHE_TTL."""
+    fetched_at = _cache_times.get(cache_key)
+    if fetched_at is None:
+        return True
+    age = (datetime.now(timezone.utc) - fetched_at).total_seconds()
+    return age >= CACHE_TTL
+
+
+def past_events_cache_key(page: int = 1, limit: int = 50) -> str:
+    """Return the cache key used for a server-side paginated page of past events."""
+    return f"events_page_{page}_limit_{limit}"
+
+
 def _parse_iso(dt_str: str) -> Optional[datetime]:
     """Parse an ISO datetime string into a datetime object, handling 'Z' suffix."""
     if not dt_str:
@@ -180,7 +218,7 @@ def get_past_events(
     """
     if year is None:
         params = {"page": page, "limit": limit}
-        cache_key = f"events_page_{page}_limit_{limit}"
+        cache_key = past_events_cache_key(page=page, limit=limit)
         data = _get_cached(
             EVENTS_ENDPOINT, params=params, cache_key=cache_key, force=force
         )
@@ -251,6 +289,17 @@ def get_committee_members(limit: int = 50, force: bool = False) -> List[Dict[str
     return docs[:limit]
 
 
+def refresh_cache():
+    """Refetch the datasets the bot's context is built from, so lookups don't have to.
+    Failed fetches keep the stale data."""
+    get_cached_events(force=True)
+    get_past_events(limit=RAG_PAST_EVENTS_LIMIT, page=1, force=True)
+    get_fng_food_dates(force=True)
+    get_committee_members(force=True)
+    get_projects(force=True)
+    get_sponsors(force=True)
+
+
 def get_committee_summary(max_items: int = 50) -> str:
     """Return a summary string of committee members."""
     members = get_committee_members(limit=max_items)
@@ -0,0 +1,70 @@
+import asyncio
+import hashlib
+import json
+import logging
+from pathlib import Path
+from typing import Optional
+
+from discord import Object, app_commands
+
+from models.database import get_db_folder
+
+
+def tree_hash(tree: app_commands.CommandTree, guild: Optional[Object] = None) -> str:
+    """Return a stable hash of the commands `tree.sync(guild=guild)` would upload."""
+    payload = sorted(
+        (command.to_dict(tree) for command in tree.get_commands(guild=guild)),
+        key=lambda command: (command.get("type", 1), command["name"]),
+    )
+    return hashlib.sha256(
+        json.dumps(payload, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+class CommandSyncManager:
+    """Sync the app command tree only when it differs from what was last synced.
+
+    Syncing is a slow, heavily rate-limited REST call, so the hash of each
+    synced tree is persisted per application and scope (global or a guild id)
+    and compared on start-up.
+    """
+
+    def __init__(self, path: Path = None):
+        self.path = path or get_db_folder() / "command_tree_hashes.json"
+        self._lock = asyncio.Lock()
+
+    def _load(self) -> dict:
+        try:
+            return json.loads(self.path.read_text())
+        except FileNotFoundError:
+            return {}
+        except Exception:
+            logging.exception(f"Failed to read command tree hashes from {self.path}")
+            return {}
+
+    def _save(self, hashes: dict):
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(hashes, indent=2, sort_keys=True))
+        tmp_path.replace(self.path)
+
+    async def sync(
+        self,
+        tree: app_commands.CommandTree,
+        guild: Optional[Object] = None,
+        force: bool = False,
+    ) -> bool:
+        """Sync the tree globally (or to `guild`) if it changed since the last sync.
+        Returns True if a sync was performed."""
+        scope = f"{tree.client.application_id}:{guild.id if guild else 'global'}"
+        digest = tree_hash(tree, guild)
+        async with self._lock:
+            hashes = self._load()
+            if not force and hashes.get(scope) == digest:
+                logging.info(f"Command tree unchanged for {scope}, skipping sync")
+                return False
+
+            synced = await tree.sync(guild=guild)
+            hashes[scope] = digest
+            self._save(hashes)
+            logging.info(f"Synced {len(synced)} commands for {scope}")
+            return True
@@ -0,0 +1,155 @@
+import time
+from collections import OrderedDict, deque
+from typing import Optional
+
+
+def _first_line(text: str, limit: int) -> str:
+    """Shorten `text` to its first line, at most `limit` characters."""
+    line = text.strip().split("\n", 1)[0]
+    return line if len(line) <= limit else line[: limit - 1] + "…"
+
+
+class _Conversation:
+    """The recent turns of one user in one channel or thread, and a summary of older ones."""
+
+    __slots__ = ("turns", "turn_tokens", "summary", "summary_tokens", "last_active")
+
+    def __init__(self):
+        self.turns: deque[tuple[str, str, int]] = deque()
+        self.turn_tokens = 0
+        self.summary: deque[tuple[str, int]] = deque()
+        self.summary_tokens = 0
+        self.last_active = 0.0
+
+    @property
+    def tokens(self) -> int:
+        return self.turn_tokens + self.summary_tokens
+
+
+class ConversationMemory:
+    """Per-conversation history for Gemini prompts, bounded in tokens and conversations.
+
+    A conversation is one user's exchanges with DuckBot in one channel or
+    thread, keyed by (channel_id, user_id), so one user's messages are never
+    sent with another's prompts. Each conversation keeps its latest turns verbatim within `turn_budget`
+    tokens. Older turns are folded into a short extractive summary (the first
+    line of the question and answer) limited to `summary_budget` tokens, so
+    long conversations keep their gist without growing the prompt. Idle
+    conversations expire after `idle_ttl` seconds, and the least recently
+    active ones are evicted while more than `max_conversations` are held or
+    they total more than `max_total_tokens` tokens.
+    """
+
+    SUMMARY_LINE_CHARS = 120
+
+    def __init__(
+        self,
+        estimator,
+        turn_budget: int = 1500,
+        summary_budget: int = 300,
+        idle_ttl: int = 3600,
+        max_conversations: int = 500,
+        max_total_tokens: int = 200_000,
+    ):
+        self.estimator = estimator
+        self.turn_budget = turn_budget
+        self.summary_budget = summary_budget
+        self.idle_ttl = idle_ttl
+        self.max_conversations = max_conversations
+        self.max_total_tokens = max_total_tokens
+
+        # Conversations in order of last activity, least recent first
+        self._conversations: OrderedDict[tuple[int, int], _Conversation] = OrderedDict()
+        self.total_tokens = 0
+
+    def _get(
+        self, conversation_id: tuple[int, int], now: float
+    ) -> Optional[_Conversation]:
+        conversation = self._conversations.get(conversation_id)
+        if conversation is not None and now - conversation.last_active >= self.idle_ttl:
+            self._remove(conversation_id)
+            conversation = None
+        return conversation
+
+    def _remove(self, conversation_id: tuple[int, int]):
+        conversation = self._conversations.pop(conversation_id, None)
+        if conversation is not None:
+            self.total_tokens -= conversation.tokens
+
+    def history(self, conversation_id: tuple[int, int]) -> str:
+        """Return the conversation so far as prompt text, or "" if there is none."""
+        conversation = self._get(conversation_id, time.time())
+        if conversation is None:
+            return ""
+        lines = [line for line, _ in conversation.summary]
+        if lines:
+            lines.insert(0, "Earlier in the conversation:")
+        for user_text, model_text, _ in conversation.turns:
+            lines.append(f"User: {user_text}")
+            lines.append(f"DuckBot: {model_text}")
+        return "\n".join(lines)
+
+    def add_turn(
+        self, conversation_id: tuple[int, int], user_text: str, model_text: str
+    ):
+        """Record a question and its answer, folding older turns into the summary."""
+        now = time.time()
+        conversation = self._get(conversation_id, now)
+        if conversation is None:
+            conversation = self._conversations[conversation_id] = _Conversation()
+        self._conversations.move_to_end(conversation_id)
+        conversation.last_active = now
+
+        before = conversation.tokens
+        tokens = self.estimator.estimate(user_text) + self.estimator.estimate(
+            model_text
+        )
+        conversation.turns.append((user_text, model_text, tokens))
+        conversation.turn_tokens += tokens
+
+        # Always keep the latest turn, even if it alone exceeds the budget
+        while (
+            conversation.turn_tokens > self.turn_budget and len(conversation.turns) > 1
+        ):
+            old_user, old_model, old_tokens = conversation.turns.popleft()
+            conversation.turn_tokens -= old_tokens
+            line = (
+                f"- User asked: {_first_line(old_user, self.SUMMARY_LINE_CHARS)} "
+                f"DuckBot answered: {_first_line(old_model, self.SUMMARY_LINE_CHARS)}"
+            )
+            line_tokens = self.estimator.estimate(line)
+            conversation.summary.append((line, line_tokens))
+            conversation.summary_tokens += line_tokens
+            while conversation.summary_tokens > self.summary_budget:
+                _, dropped = conversation.summary.popleft()
+                conversation.summary_tokens -= dropped
+
+        self.total_tokens += conversation.tokens - before
+        self._evict(now)
+
+    def _evict(self, now: float):
+        """Drop idle conversations, then the least recent ones while over the caps."""
+        while self._conversations:
+            conversation_id, conversation = next(iter(self._conversations.items()))
+            if (
+                now - conversation.last_active < self.idle_ttl
+                and len(self._conversations) <= self.max_conversations
+                and self.total_tokens <= self.max_total_tokens
+            ):
+                break
+            # Never evict the conversation that was just updated
+            if len(self._conversations) == 1:
+                break
+            self._remove(conversation_id)
+
+    def clear(self, channel_id: Optional[int] = None):
+        """Forget every user's conversation in a channel, or every conversation if no channel is given."""
+        if channel_id is None:
+            self._conversations.clear()
+            self.total_tokens = 0
+            return
+        for key in [key for key in self._conversations if key[0] == channel_id]:
+            self._remove(key)
+
+    def __len__(self):
+        return len(self._conversations)
@@ -0,0 +1,136 @@
+import asyncio
+import hashlib
+import logging
+import time
+from typing import Optional
+
+from utils.lazy_import import lazy_import
+
+genai = lazy_import("google.genai")
+
+# Error codes meaning the cached context itself is unusable (expired, deleted or inaccessible)
+CACHE_FALLBACK_CODES = (403, 404)
+
+
+def is_cache_error(error) -> bool:
+    """Return True if `error` means the cached context was rejected, not the request.
+
+    A 400 only counts if its message is about the cached content; any other
+    bad request would fail just the same without the cache.
+    """
+    code = getattr(error, "code", None)
+    if code in CACHE_FALLBACK_CODES:
+        return True
+    message = str(error).lower().replace("_", "").replace(" ", "")
+    return code == 400 and "cachedcontent" in message
+
+
+class GeminiContextCache:
+    """Keep a server-side Gemini cached context for a static system instruction.
+
+    The cache is created on first use, has its TTL extended shortly before it
+    expires, and is replaced whenever the instruction changes. If the API
+    refuses to cache (e.g. the content is below the model's minimum token
+    count), caching is paused for `retry_after` seconds and callers fall back
+    to sending the instruction with every request.
+    """
+
+    def __init__(
+        self,
+        client,
+        model_name: str,
+        ttl: int = 3600,
+        refresh_margin: int = 300,
+        retry_after: int = 600,
+    ):
+        self.client = client
+        self.model_name = model_name
+        self.ttl = ttl
+        self.refresh_margin = refresh_margin
+        self.retry_after = retry_after
+
+        self.name: Optional[str] = None
+        self._fingerprint: Optional[str] = None
+        self._expires_at = 0.0
+        self._disabled_until = 0.0
+        self._lock = asyncio.Lock()
+        # Deletions scheduled by invalidate(), referenced until they finish
+        self._deletions: set[asyncio.Task] = set()
+
+    def _is_usable(self, fingerprint: str) -> bool:
+        """Return True if the current cache matches `fingerprint` and is not close to expiring."""
+        return (
+            self.name is not None
+            and self._fingerprint == fingerprint
+            and time.monotonic() < self._expires_at - self.refresh_margin
+        )
+
+    async def get(self, system_instruction: str) -> Optional[str]:
+        """Return the name of a cached context holding `system_instruction`, or None if unavailable."""
+        fingerprint = hashlib.sha256(
+            f"{self.model_name}\0{system_instruction}".encode()
+        ).hexdigest()
+        if self._is_usable(fingerprint):
+            return self.name
+        if time.monotonic() < self._disabled_until:
+            return None
+
+        async with self._lock:
+            # Another task may have refreshed the cache while we waited
+            if self._is_usable(fingerprint):
+                return self.name
+            try:
+                if self.name is not None and self._fingerprint == fingerprint:
+                    await self.client.aio.caches.update(
+                        name=self.name,
+                        config=genai.types.UpdateCachedContentConfig(
+                            ttl=f"{self.ttl}s"
+                        ),
+                    )
+                    logging.info(f"GEMINI: Extended context cache {self.name}")
+                else:
+                    cache = await self.client.aio.caches.create(
+                        model=self.model_name,
+                        config=genai.types.CreateCachedContentConfig(
+                            display_name="duckbot-system-instruction",
+                            system_instruction=system_instruction,
+                            ttl=f"{self.ttl}s",
+                        ),
+                    )
+                    await self._delete(self.name)
+                    self.name = cache.name
+                    self._fingerprint = fingerprint
+                    logging.info(f"GEMINI: Created context cache {self.name}")
+                self._expires_at = time.monotonic() + self.ttl
+                return self.name
+            except Exception as e:
+                logging.warning(
+                    f"GEMINI: Context caching unavailable, retrying in {self.retry_after}s: {e}"
+                )
+                self.name = None
+                self._fingerprint = None
+                self._disabled_until = time.monotonic() + self.retry_after
+                return None
+
+    def invalidate(self):
+        """Forget the current cache and delete it, e.g. after the API rejects it.
+
+        Must be called from the event loop, where the deletion is scheduled.
+        """
+        name = self.name
+        self.name = None
+        self._fingerprint = None
+        self._expires_at = 0.0
+        if name is not None:
+            task = asyncio.get_running_loop().create_task(self._delete(name))
+            self._deletions.add(task)
+            task.add_done_callback(self._deletions.discard)
+
+    async def _delete(self, name: Optional[str]):
+        """Delete a superseded or rejected cache, ignoring failures as it will expire anyway."""
+        if name is None:
+            return
+        try:
+            await self.client.aio.caches.delete(name=name)
+        except Exception:
+            logging.info(f"GEMINI: Could not delete context cache {name}")
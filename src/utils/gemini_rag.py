@@ -1,28 +1,19 @@
 from __future__ import annotations
 
-import difflib
 import logging
 import re
-from typing import Optional
+from datetime import datetime, timezone
+from typing import Callable, Optional
 
 from utils import cms
+from utils.retrieval import HashingEmbedder, VectorIndex
+from utils.topic_router import TopicRouter
 
-
-def matches_any(tokens: list[str], keywords: list[str], cutoff: float = 0.8) -> bool:
-    """Return True if any token approximately matches any keyword.
-
-    Uses difflib.get_close_matches for fuzzy matching (typos) and exact matching too.
-    """
-    keywords_lower = [k.lower() for k in keywords]
-    for t in tokens:
-        # exact checks faster than fuzzy
-        if t in keywords_lower:
-            return True
-        # fuzzy check
-        matches = difflib.get_close_matches(t, keywords_lower, n=1, cutoff=cutoff)
-        if matches:
-            return True
-    return False
+UPCOMING_EVENTS_LIMIT = 10
+PAST_EVENTS_LIMIT = cms.RAG_PAST_EVENTS_LIMIT
+SUMMARY_MAX_ITEMS = 100
+CMS_SNIPPETS_PER_QUERY = 5
+CMS_MIN_SCORE = 0.2
 
 
 def _shorten(s: str, n: int) -> str:
@@ -35,105 +26,218 @@ def _shorten(s: str, n: int) -> str:
     return s[: n - 3] + "..."
 
 
+class _ContextBlock:
+    """A rendered topic block and the CMS cache version it was rendered from."""
+
+    __slots__ = ("version", "text", "expires_at")
+
+    def __init__(self, version: int, text: str, expires_at: Optional[datetime]):
+        self.version = version
+        self.text = text
+        self.expires_at = expires_at
+
+
+# Rendered topic blocks, keyed by topic name
+_block_cache: dict[str, _ContextBlock] = {}
+# "generation" is bumped whenever a block is (re-)rendered, so the snippet index knows when to rebuild
+_index_state = {"generation": 0, "index": None, "index_generation": -1}
+_embedder = HashingEmbedder()
+
+
+def _render_upcoming_events() -> tuple[str, Optional[datetime]]:
+    """Render the upcoming events block.
+
+    The block expires once the first listed event starts, as it is no longer upcoming.
+    """
+    upcoming = cms.get_upcoming_events(limit=UPCOMING_EVENTS_LIMIT)
+    if not upcoming:
+        return "", None
+    up_parts = ["Upcoming events:"]
+    for ev in upcoming:
+        title = ev.get("title", "Untitled").strip()
+        time_info = ev.get("time") or {}
+        start = time_info.get("start") or ev.get("date") or ""
+        end = time_info.get("end") or ""
+        time_range = cms.fmt_time_range_friendly(start, end, ev.get("date"))
+        loc = (ev.get("location") or "").strip()
+        desc = _shorten(ev.get("details") or ev.get("description") or "", 120)
+        up_parts.append(f"- {title} | {time_range} | {loc} | {desc}")
+    return "\n".join(up_parts), upcoming[0].get("_parsed_date")
+
+
+def _render_past_events() -> tuple[str, Optional[datetime]]:
+    """Render the recent past events block."""
+    past_result = cms.get_past_events(limit=PAST_EVENTS_LIMIT, page=1)
+    past = past_result.get("docs", [])
+    if not past:
+        return "", None
+    p_parts = ["Recent past events:"]
+    for ev in past:
+        title = ev.get("title", "Untitled").strip()
+        time_info = ev.get("time") or {}
+        start = time_info.get("start") or ev.get("date") or ""
+        time_range = cms.fmt_time_range_friendly(start, "", ev.get("date"))
+        desc = _shorten(ev.get("details") or ev.get("description") or "", 120)
+        p_parts.append(f"- {title} | {time_range} | {desc}")
+    return "\n".join(p_parts), None
+
+
+def _render_committee() -> tuple[str, Optional[datetime]]:
+    """Render the committee members block."""
+    return cms.get_committee_summary(max_items=SUMMARY_MAX_ITEMS), None
+
+
+def _render_projects() -> tuple[str, Optional[datetime]]:
+    """Render the open-source projects block."""
+    return cms.get_projects_summary(max_items=SUMMARY_MAX_ITEMS), None
+
+
+def _render_sponsors() -> tuple[str, Optional[datetime]]:
+    """Render the sponsors block."""
+    return cms.get_sponsors_summary(max_items=SUMMARY_MAX_ITEMS), None
+
+
+# Topic name -> (keywords, CMS cache key, renderer), in the order blocks appear in the context
+TOPICS: dict[
+    str, tuple[list[str], str, Callable[[], tuple[str, Optional[datetime]]]]
+] = {
+    "upcoming_events": (
+        ["event", "events", "workshop", "upcoming", "fng"],
+        "events",
+        _render_upcoming_events,
+    ),
+    "past_events": (
+        ["past", "last", "recent", "event", "events"],
+        cms.past_events_cache_key(page=1, limit=PAST_EVENTS_LIMIT),
+        _render_past_events,
+    ),
+    "committee": (
+        [
+            "committee",
+            "committee members",
+            "committee list",
+            "commitee",
+            "comittee",
+        ],
+        "committee",
+        _render_committee,
+    ),
+    "projects": (
+        ["project", "projects", "open", "open source", "open-source"],
+        "projects",
+        _render_projects,
+    ),
+    "sponsors": (
+        ["sponsor", "sponsors", "company", "sponser"],
+        "sponsors",
+        _render_sponsors,
+    ),
+}
+
+
+_ROUTER = TopicRouter({topic: keywords for topic, (keywords, _, _) in TOPICS.items()})
+
+
+def get_topic_block(topic: str) -> str:
+    """Return the rendered context block for `topic`.
+
+    Blocks are rendered once per CMS refresh and memoised; a block is only
+    re-rendered when its CMS data has been refetched, is due for a refetch, or
+    the block itself has expired.
+    """
+    _, cache_key, render = TOPICS[topic]
+    block = _block_cache.get(topic)
+    if (
+        block is not None
+        and block.version == cms.get_cache_version(cache_key)
+        and not cms.is_cache_stale(cache_key)
+        and (block.expires_at is None or datetime.now(timezone.utc) < block.expires_at)
+    ):
+        return block.text
+
+    text, expires_at = render()
+    _block_cache[topic] = _ContextBlock(
+        cms.get_cache_version(cache_key), text, expires_at
+    )
+    _index_state["generation"] += 1
+    return text
+
+
+def clear_context_cache():
+    """Drop all memoised topic blocks so they are re-rendered on next use."""
+    _block_cache.clear()
+    _index_state["generation"] += 1
+
+
+def _get_cms_index() -> VectorIndex:
+    """Return a vector index over the entries of the rendered topic blocks.
+
+    Only blocks that have already been rendered are indexed, so retrieval
+    never triggers a CMS fetch. The index is rebuilt when any block changes.
+    """
+    generation = _index_state["generation"]
+    if _index_state["index_generation"] == generation:
+        return _index_state["index"]
+
+    snippets = []
+    for block in _block_cache.values():
+        lines = block.text.splitlines()
+        if not lines:
+            continue
+        # Keep the block heading with each entry, e.g. "Committee members: - Name: Role"
+        heading = lines[0]
+        snippets.extend(
+            f"{heading} {line}" for line in lines[1:] if line.startswith("- ")
+        )
+
+    index = VectorIndex.build(snippets, _embedder)
+    _index_state["index"] = index
+    _index_state["index_generation"] = generation
+    return index
+
+
+def retrieve_cms_snippets(
+    message: str, k: int = CMS_SNIPPETS_PER_QUERY, min_score: float = CMS_MIN_SCORE
+) -> list[str]:
+    """Return the CMS entries most similar to `message`, best first."""
+    return [doc for _, doc in _get_cms_index().search(message, k, min_score)]
+
+
 def build_cms_context_for_query(message: str, char_limit: Optional[int] = None) -> str:
     """Compose a small CMS context block for a user's query.
 
-    This will only include CMS data if the query references those topics, to
-    avoid preloading huge system contexts. The returned string is truncated to
-    char_limit characters.
+    This will only include whole CMS topics if the query references those
+    topics, to avoid preloading huge system contexts. Otherwise the few most
+    similar CMS entries already in memory are included. The returned string is
+    truncated to char_limit characters.
     """
     if not message:
         return ""
     char_limit = 3000
     text = message.lower()
     tokens = re.findall(r"\w+", text)
+    matched = _ROUTER.classify(tokens)
     parts: list[str] = []
 
-    try:
-        # Upcoming events
-        if matches_any(
-            tokens,
-            [
-                "event",
-                "events",
-                "workshop",
-                "upcoming",
-                "fng",
-            ],
-        ):
-            upcoming = cms.get_upcoming_events(limit=10)
-            if upcoming:
-                up_parts = ["Upcoming events:"]
-                for ev in upcoming:
-                    title = ev.get("title", "Untitled").strip()
-                    time_info = ev.get("time") or {}
-                    start = time_info.get("start") or ev.get("date") or ""
-                    end = time_info.get("end") or ""
-                    time_range = cms.fmt_time_range_friendly(start, end, ev.get("date"))
-                    loc = (ev.get("location") or "").strip()
-                    desc = _shorten(
-                        ev.get("details") or ev.get("description") or "", 120
-                    )
-                    up_parts.append(f"- {title} | {time_range} | {loc} | {desc}")
-                parts.append("\n".join(up_parts))
-
-        # Past events
-        if matches_any(
-            tokens,
-            [
-                "past",
-                "last",
-                "recent",
-                "event",
-                "events",
-            ],
-        ):
-            past_result = cms.get_past_events(limit=50, page=1)
-            past = past_result.get("docs", [])
-            if past:
-                p_parts = ["Recent past events:"]
-                for ev in past:
-                    title = ev.get("title", "Untitled").strip()
-                    time_info = ev.get("time") or {}
-                    start = time_info.get("start") or ev.get("date") or ""
-                    time_range = cms.fmt_time_range_friendly(start, "", ev.get("date"))
-                    desc = _shorten(
-                        ev.get("details") or ev.get("description") or "", 120
-                    )
-                    p_parts.append(f"- {title} | {time_range} | {desc}")
-                parts.append("\n".join(p_parts))
-
-        # Committee members
-        if matches_any(
-            tokens,
-            [
-                "committee",
-                "committee members",
-                "committee list",
-                "commitee",
-                "comittee",
-            ],
-        ):
-            csum = cms.get_committee_summary(max_items=100)
-            if csum:
-                parts.append(csum)
-
-        # Projects
-        if matches_any(
-            tokens, ["project", "projects", "open", "open source", "open-source"]
-        ):
-            psum = cms.get_projects_summary(max_items=100)
-            if psum:
-                parts.append(psum)
-
-        # Sponsors
-        if matches_any(tokens, ["sponsor", "sponsors", "company", "sponser"]):
-            ssum = cms.get_sponsors_summary(max_items=100)
-            if ssum:
-                parts.append(ssum)
-
-    except Exception:
-        logging.exception("Failed to assemble CMS RAG context for query")
+    for topic in TOPICS:
+        if topic not in matched:
+            continue
+        try:
+            block = get_topic_block(topic)
+        except Exception:
+            logging.exception(f"Failed to assemble CMS RAG context for {topic}")
+            continue
+        if block:
+            parts.append(block)
+
+    if not matched:
+        try:
+            snippets = retrieve_cms_snippets(message)
+        except Exception:
+            logging.exception("Failed to retrieve CMS snippets for query")
+            snippets = []
+        if snippets:
+            parts.append("Relevant club info:\n" + "\n".join(snippets))
 
     if not parts:
         return ""
@@ -1,3 +1,4 @@
+import logging
 import os
 import random
 from typing import Optional
@@ -22,7 +23,7 @@ async def get_klipy_gif(search_term: str) -> Optional[str]:
         try:
             async with session.get(url, params=params) as response:
                 if response.status != 200:
-                    print(f"Error fetching GIF: {response.status}")
+                    logging.error(f"Error fetching GIF: {response.status}")
                     return None
                 data = await response.json()
                 results = data.get("data", {}).get("data", [])
@@ -31,5 +32,5 @@ async def get_klipy_gif(search_term: str) -> Optional[str]:
                 result = random.choice(results)
                 return result.get("file", {}).get("hd", {}).get("gif", {}).get("url")
         except Exception as e:
-            print(f"Error fetching GIF: {str(e)}")
+            logging.error(f"Error fetching GIF: {str(e)}")
             return None
@@ -0,0 +1,32 @@
+import importlib
+import sys
+import types
+
+
+class _LazyModule(types.ModuleType):
+    """Stands in for a module until one of its attributes is first accessed."""
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self._module = None
+
+    def __getattr__(self, attr):
+        # Only called for attributes the proxy itself doesn't have
+        if self._module is None:
+            self._module = importlib.import_module(self.__name__)
+        return getattr(self._module, attr)
+
+    def __dir__(self):
+        return dir(importlib.import_module(self.__name__))
+
+
+def lazy_import(name: str):
+    """Return module `name`, deferring the import until an attribute is first accessed.
+
+    Used for heavy dependencies that only some code paths need, so importing
+    the modules that use them stays cheap at startup. Nothing, not even the
+    parent package, is imported until then.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    return _LazyModule(name)
@@ -0,0 +1,126 @@
+import asyncio
+import json
+import logging
+import random
+import time
+from pathlib import Path
+from typing import Optional
+
+import aiohttp
+
+LEETCODE_PROBLEMS_URL = "https://leetcode.com/api/problems/all/"
+LEETCODE_PROBLEMSET_URL = "https://leetcode.com/problemset/"
+
+
+def parse_problem_slugs(data: dict) -> list[str]:
+    """Extract the slugs of free problems from a LeetCode problems API response."""
+    return [
+        pair["stat"]["question__title_slug"]
+        for pair in data.get("stat_status_pairs", [])
+        if not pair.get("paid_only")
+        and pair.get("stat", {}).get("question__title_slug")
+    ]
+
+
+class LeetCodeCatalogue:
+    """A local list of LeetCode problem slugs, persisted to disk and refreshed in the background.
+
+    Picking a problem never waits on the network: a stale or missing catalogue
+    schedules a refresh and answers from whatever is available meanwhile. A
+    failed refresh is retried after `retry_delay` seconds rather than on the
+    next pick, so an unavailable source is not asked for the full catalogue
+    on every call.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        url: str = LEETCODE_PROBLEMS_URL,
+        refresh_interval: int = 7 * 86400,
+        retry_delay: int = 3600,
+        timeout: int = 30,
+    ):
+        self.path = path
+        self.url = url
+        self.refresh_interval = refresh_interval
+        self.retry_delay = retry_delay
+        self.timeout = timeout
+
+        self.slugs: list[str] = []
+        self.fetched_at = 0.0
+        self._loaded = False
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    async def random_problem_url(self) -> str:
+        """Return the URL of a random problem, or the problem set if none are known yet."""
+        if not self._loaded:
+            await self._load()
+        if time.time() - self.fetched_at >= self.refresh_interval:
+            self.schedule_refresh()
+        if not self.slugs:
+            return LEETCODE_PROBLEMSET_URL
+        return f"https://leetcode.com/problems/{random.choice(self.slugs)}/"
+
+    def schedule_refresh(self):
+        """Start a background refresh unless one is already running."""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self.refresh())
+
+    async def refresh(self):
+        """Download the problem catalogue and persist its slugs."""
+        try:
+            client_timeout = aiohttp.ClientTimeout(total=self.timeout)
+            async with aiohttp.ClientSession(timeout=client_timeout) as session:
+                async with session.get(self.url) as resp:
+                    if resp.status != 200:
+                        logging.error(
+                            f"Failed to refresh LeetCode catalogue: status {resp.status}"
+                        )
+                        self._back_off()
+                        return
+                    body = await resp.read()
+            # The full catalogue is several megabytes, so parse it off the event loop
+            slugs = await asyncio.to_thread(
+                lambda: parse_problem_slugs(json.loads(body))
+            )
+        except Exception:
+            logging.exception("Failed to refresh LeetCode catalogue")
+            self._back_off()
+            return
+
+        if not slugs:
+            logging.error("LeetCode catalogue refresh returned no problems")
+            self._back_off()
+            return
+        self.slugs = slugs
+        self.fetched_at = time.time()
+        try:
+            await asyncio.to_thread(self._write, slugs, self.fetched_at)
+        except Exception:
+            logging.exception(f"Failed to persist LeetCode catalogue to {self.path}")
+        logging.info(f"Refreshed LeetCode catalogue with {len(slugs)} problems")
+
+    def _back_off(self):
+        """Make the catalogue due for a refresh again in `retry_delay` seconds."""
+        self.fetched_at = max(
+            self.fetched_at, time.time() - self.refresh_interval + self.retry_delay
+        )
+        logging.info(f"Retrying the LeetCode catalogue refresh in {self.retry_delay}s")
+
+    async def _load(self):
+        """Load the persisted catalogue, if any."""
+        self._loaded = True
+        try:
+            data = await asyncio.to_thread(lambda: json.loads(self.path.read_text()))
+            self.slugs = data["slugs"]
+            self.fetched_at = data["fetched_at"]
+        except FileNotFoundError:
+            pass
+        except Exception:
+            logging.exception(f"Failed to load LeetCode catalogue from {self.path}")
+
+    def _write(self, slugs: list[str], fetched_at: float):
+        """Atomically write the catalogue to disk."""
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps({"fetched_at": fetched_at, "slugs": slugs}))
+        tmp_path.replace(self.path)
@@ -0,0 +1,146 @@
+import atexit
+import copy
+import gzip
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+from datetime import datetime
+from typing import Optional
+
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+LOG_FILE = os.environ.get("LOG_FILE", "DuckBot.log")
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+# "text" for the classic one-line format, or "json" for one JSON object per line
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "text").lower()
+# Rotate at a time of day/interval (e.g. "midnight", "H") instead of by size if set
+LOG_ROTATE_WHEN = os.environ.get("LOG_ROTATE_WHEN", "")
+LOG_MAX_BYTES = int(os.environ.get("LOG_MAX_BYTES", "10000000"))
+LOG_BACKUP_COUNT = int(os.environ.get("LOG_BACKUP_COUNT", "10"))
+LOG_COMPRESS = os.environ.get("LOG_COMPRESS", "true").lower() == "true"
+
+TEXT_FORMAT = "%(asctime)s %(levelname)-8s %(message)s"
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats each record as a single-line JSON object."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "module": record.module,
+            "function": record.funcName,
+            "line": record.lineno,
+            "thread": record.threadName,
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = record.stack_info
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Queues records with their message and traceback rendered, but left unformatted.
+
+    The default handler formats the whole record before queueing it, which
+    would prevent the listener's formatter (e.g. JSON) from seeing the fields.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _gzip_rotator(source: str, dest: str):
+    with open(source, "rb") as f_in, gzip.open(dest, "wb") as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
+
+
+def build_file_handler(
+    path: str = LOG_FILE,
+    when: str = LOG_ROTATE_WHEN,
+    max_bytes: int = LOG_MAX_BYTES,
+    backup_count: int = LOG_BACKUP_COUNT,
+    compress: bool = LOG_COMPRESS,
+    json_format: bool = LOG_FORMAT == "json",
+) -> logging.Handler:
+    """Return a file handler rotating by time (if `when` is set) or by size."""
+    if when:
+        handler = logging.handlers.TimedRotatingFileHandler(
+            path, when=when, backupCount=backup_count, encoding="utf-8"
+        )
+    else:
+        handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+        )
+    if compress:
+        handler.namer = lambda name: f"{name}.gz"
+        handler.rotator = _gzip_rotator
+    handler.setFormatter(
+        JsonFormatter() if json_format else logging.Formatter(TEXT_FORMAT, DATE_FORMAT)
+    )
+    return handler
+
+
+class LogPipeline:
+    """Routes log records through a queue to handlers run by a background thread.
+
+    Logging from the event loop then costs only a queue put, while writing,
+    rotating and compressing the log file happen on the listener thread.
+    """
+
+    def __init__(self):
+        self.queue: queue.SimpleQueue = queue.SimpleQueue()
+        self.listener: Optional[logging.handlers.QueueListener] = None
+        self.queue_handler: Optional[logging.Handler] = None
+
+    def start(self, *handlers: logging.Handler, level: str = LOG_LEVEL):
+        """Send every record logged at `level` or above to `handlers` (default: the log file)."""
+        if self.listener is not None:
+            return
+        self.listener = logging.handlers.QueueListener(
+            self.queue,
+            *(handlers or (build_file_handler(),)),
+            respect_handler_level=True,
+        )
+        self.listener.start()
+        self.queue_handler = _QueueHandler(self.queue)
+        root = logging.getLogger()
+        root.addHandler(self.queue_handler)
+        root.setLevel(level)
+        atexit.register(self.stop)
+
+    def stop(self):
+        """Write out the queued records and stop the listener thread."""
+        if self.listener is None:
+            return
+        logging.getLogger().removeHandler(self.queue_handler)
+        self.listener.stop()
+        for handler in self.listener.handlers:
+            handler.close()
+        self.listener = None
+        self.queue_handler = None
+
+
+pipeline = LogPipeline()
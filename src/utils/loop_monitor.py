@@ -0,0 +1,165 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Optional
+
+from dotenv import load_dotenv
+
+from utils.metrics import registry
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Measure event loop lag and report code that blocks the loop. Off by default, as
+# the heartbeat and watchdog wake several times a second even while the bot is idle
+LOOP_MONITOR_ENABLED = os.environ.get("LOOP_MONITOR_ENABLED", "false").lower() == "true"
+# Stalls longer than this are logged with the stack of the blocking code
+LOOP_BLOCK_THRESHOLD_MS = float(os.environ.get("LOOP_BLOCK_THRESHOLD_MS", "250"))
+# Also run the loop in asyncio debug mode, which logs every slow callback (expensive)
+LOOP_DEBUG = os.environ.get("LOOP_DEBUG", "false").lower() == "true"
+
+LOOP_LAG_SECONDS = registry.histogram(
+    "duckbot_event_loop_lag_seconds",
+    "How late the event loop ran a heartbeat scheduled to wake after a fixed interval",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+LOOP_LAG_MAX_SECONDS = registry.gauge(
+    "duckbot_event_loop_lag_max_seconds",
+    "The largest event loop lag over the recent window",
+)
+LOOP_BLOCKED = registry.counter(
+    "duckbot_event_loop_blocked_total",
+    "Times the event loop was blocked for longer than the threshold",
+)
+
+
+def _percentile(ordered: list, fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class LoopMonitor:
+    """Measures event loop lag and reports the code blocking the loop.
+
+    A heartbeat task sleeps for `interval` seconds at a time and records how
+    much later than that it woke up. A watchdog thread checks the heartbeat
+    and, if the loop has not beaten for `block_threshold` seconds past its
+    interval, logs the event loop thread's current stack: the code that is
+    blocking it. Each stall is reported once, with its total length logged
+    when the loop recovers. A block is caught if it is at least `interval`
+    plus `block_threshold` long, so the interval is kept short.
+    """
+
+    def __init__(
+        self,
+        interval: float = 0.25,
+        block_threshold: float = LOOP_BLOCK_THRESHOLD_MS / 1000,
+        window: int = 2400,
+    ):
+        self.interval = interval
+        self.block_threshold = block_threshold
+        # Lag of the most recent heartbeats (10 minutes at the default interval)
+        self.samples: deque[float] = deque(maxlen=window)
+        # Decreasing lags in the window with their beat numbers; the first is the maximum
+        self._peaks: deque[tuple[int, float]] = deque()
+        self._beats = 0
+        self.blocked = 0
+
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._loop_thread_id: Optional[int] = None
+        self._last_beat = time.monotonic()
+        # Set by the watchdog while the loop is stalled, cleared by the next heartbeat
+        self._stalled_in: Optional[str] = None
+
+    def start(self):
+        """Start monitoring the running loop. Must be called from the event loop."""
+        if self._task is not None:
+            return
+        loop = asyncio.get_running_loop()
+        if LOOP_DEBUG:
+            loop.set_debug(True)
+            loop.slow_callback_duration = self.block_threshold
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stopped.clear()
+        self._task = loop.create_task(self._heartbeat(), name="loop monitor")
+        self._thread = threading.Thread(
+            target=self._watchdog, name="loop-monitor-watchdog", daemon=True
+        )
+        self._thread.start()
+
+    async def stop(self):
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self._thread = None
+
+    async def _heartbeat(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - start - self.interval)
+            self._last_beat = time.monotonic()
+            LOOP_LAG_SECONDS.observe(lag)
+            LOOP_LAG_MAX_SECONDS.set(self._record(lag))
+
+            if self._stalled_in is not None:
+                logging.warning(
+                    f"Event loop was blocked for {lag + self.interval:.3f}s in {self._stalled_in}"
+                )
+                self._stalled_in = None
+
+    def _record(self, lag: float) -> float:
+        """Add a heartbeat's lag to the window and return the window's maximum."""
+        self.samples.append(lag)
+        while self._peaks and self._peaks[-1][1] <= lag:
+            self._peaks.pop()
+        self._peaks.append((self._beats, lag))
+        if self._peaks[0][0] <= self._beats - self.samples.maxlen:
+            self._peaks.popleft()
+        self._beats += 1
+        return self._peaks[0][1]
+
+    def _watchdog(self):
+        while not self._stopped.wait(self.block_threshold / 2):
+            stalled = time.monotonic() - self._last_beat
+            if self._stalled_in is not None or (
+                stalled < self.interval + self.block_threshold
+            ):
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            stack = traceback.extract_stack(frame)
+            self._stalled_in = (
+                f"{stack[-1].filename}:{stack[-1].lineno} ({stack[-1].name})"
+            )
+            self.blocked += 1
+            LOOP_BLOCKED.inc()
+            logging.warning(
+                f"Event loop blocked for over {stalled:.3f}s, currently in:\n"
+                + "".join(stack.format())
+            )
+
+    def stats(self) -> dict:
+        """Return the lag percentiles over the recent window, in milliseconds."""
+        if not self.samples:
+            return {"samples": 0, "blocked": self.blocked}
+        ordered = sorted(self.samples)
+        return {
+            "samples": len(ordered),
+            "lag_p50_ms": round(_percentile(ordered, 0.5) * 1000, 1),
+            "lag_p95_ms": round(_percentile(ordered, 0.95) * 1000, 1),
+            "lag_p99_ms": round(_percentile(ordered, 0.99) * 1000, 1),
+            "lag_max_ms": round(ordered[-1] * 1000, 1),
+            "blocked": self.blocked,
+        }
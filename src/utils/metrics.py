@@ -0,0 +1,315 @@
+import logging
+import os
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Set METRICS_ENABLED=true to collect metrics and serve them on METRICS_HOST:METRICS_PORT/metrics
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "false").lower() == "true"
+METRICS_HOST = os.environ.get("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "9100"))
+
+# Seconds, suiting everything from a sqlite statement to a Gemini request
+DEFAULT_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Timer:
+    """Observes the time spent inside a `with` block."""
+
+    __slots__ = ("child", "start")
+
+    def __init__(self, child):
+        self.child = child
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.child.observe(time.perf_counter() - self.start)
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+
+class _GaugeChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+    def dec(self, amount: float = 1):
+        self.value -= amount
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        # Per-bucket counts, plus one for values above the largest bucket
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def time(self) -> _Timer:
+        return _Timer(self)
+
+
+class _Metric(ABC):
+    """A named metric with one child per combination of label values."""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+
+    @abstractmethod
+    def _new_child(self):
+        """Return a new child holding the value for one combination of label values."""
+
+    def labels(self, *values):
+        """Return the child for these label values, creating it on first use."""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(
+                    f"{self.name} takes labels {self.labelnames}, got {values}"
+                )
+            child = self._children[values] = self._new_child()
+        return child
+
+    def _samples(self):
+        for values, child in sorted(self._children.items()):
+            yield self.name, _format_labels(self.labelnames, values), child.value
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        for name, labels, value in self._samples():
+            lines.append(f"{name}{labels} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1):
+        self.labels().inc(amount)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple = (),
+        buckets: tuple = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def time(self) -> _Timer:
+        return self.labels().time()
+
+    def _samples(self):
+        for values, child in sorted(self._children.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), child.counts):
+                cumulative += count
+                labels = _format_labels(
+                    self.labelnames, values, f'le="{_format_value(float(bound))}"'
+                )
+                yield f"{self.name}_bucket", labels, cumulative
+            labels = _format_labels(self.labelnames, values)
+            yield f"{self.name}_sum", labels, child.sum
+            yield f"{self.name}_count", labels, child.count
+
+
+class _NullMetric:
+    """Stands in for every metric while metrics are disabled, doing nothing."""
+
+    __slots__ = ()
+
+    def labels(self, *values):
+        return self
+
+    def inc(self, amount: float = 1):
+        pass
+
+    def dec(self, amount: float = 1):
+        pass
+
+    def set(self, value: float):
+        pass
+
+    def observe(self, value: float):
+        pass
+
+    def time(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NULL_METRIC = _NullMetric()
+
+
+class Registry:
+    """Creates and collects metrics, rendering them in the Prometheus text format.
+
+    While disabled, every metric it creates is a shared no-op, so instrumented
+    code costs only a method call.
+    """
+
+    def __init__(self, enabled: bool = METRICS_ENABLED):
+        self.enabled = enabled
+        self.metrics: dict[str, _Metric] = {}
+        self._runner = None
+
+    def _register(self, metric_class, name: str, *args, **kwargs):
+        if not self.enabled:
+            return _NULL_METRIC
+        metric = self.metrics.get(name)
+        if metric is None:
+            metric = self.metrics[name] = metric_class(name, *args, **kwargs)
+        elif not isinstance(metric, metric_class):
+            raise ValueError(f"Metric {name} is already registered as a {metric.kind}")
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple = ()):
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple = ()):
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple = (),
+        buckets: tuple = DEFAULT_BUCKETS,
+    ):
+        return self._register(Histogram, name, documentation, labelnames, buckets)
+
+    def render(self) -> str:
+        """Return every metric in the Prometheus text exposition format."""
+        return "\n".join(metric.render() for metric in self.metrics.values()) + "\n"
+
+    async def start_server(self, host: str = METRICS_HOST, port: int = METRICS_PORT):
+        """Serve the metrics on http://host:port/metrics, if enabled.
+        Raises OSError if the address cannot be bound."""
+        if not self.enabled or self._runner is not None:
+            return
+        # Only needed when metrics are served, so keep it out of startup otherwise
+        from aiohttp import web  # noqa: PLC0415
+
+        async def handle_metrics(request):
+            return web.Response(
+                text=self.render(), content_type="text/plain", charset="utf-8"
+            )
+
+        app = web.Application()
+        app.router.add_get("/metrics", handle_metrics)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        try:
+            await web.TCPSite(runner, host, port).start()
+        except OSError:
+            await runner.cleanup()
+            raise
+        self._runner = runner
+        logging.info(f"Serving metrics on http://{host}:{port}/metrics")
+
+    async def stop_server(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+registry = Registry()
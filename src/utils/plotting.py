@@ -1,8 +1,11 @@
 import io
 from typing import List, Tuple
 
-import matplotlib.pyplot as plt
-from matplotlib.ticker import MaxNLocator
+from utils.lazy_import import lazy_import
+
+# pyplot takes most of a second to import, and is only needed to draw histograms
+plt = lazy_import("matplotlib.pyplot")
+ticker = lazy_import("matplotlib.ticker")
 
 GREY = (0.5, 0.5, 0.5, 1)
 WHITE = (1, 1, 1, 1)
@@ -81,7 +84,7 @@ def get_histogram_image(
     ax.xaxis.set_tick_params(labelbottom=True)
     ax.tick_params(axis="x", colors=WHITE)
     ax.tick_params(axis="y", colors=WHITE)
-    ax.yaxis.set_major_locator(MaxNLocator(integer=True))  # integer only ticks
+    ax.yaxis.set_major_locator(ticker.MaxNLocator(integer=True))  # integer only ticks
 
     # add transparency
     fig.patch.set_alpha(0)
@@ -0,0 +1,110 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+
+
+class _UserWindows:
+    """Request times for one user, one deque per window."""
+
+    __slots__ = ("last_seen", "windows")
+
+    def __init__(self, limits: list[tuple[int, int]]):
+        self.last_seen = 0.0
+        # A window never holds more requests than its limit, so bound each deque by it
+        self.windows = [deque(maxlen=max_requests) for _, max_requests in limits]
+
+
+class RateLimiter:
+    """Per-user sliding-window rate limits, shareable between expensive commands.
+
+    `limits` maps a window length in seconds to the number of requests allowed
+    within it, e.g. {60: 3, 86400: 5}. Checking and recording a request is
+    amortised O(1), and users idle for longer than the largest window are
+    evicted. If a RateLimitDB is given, accepted requests are persisted under
+    `scope` so quotas survive restarts.
+    """
+
+    DB_PRUNE_INTERVAL = 3600
+
+    def __init__(self, scope: str, limits: dict[int, int], db=None):
+        self.scope = scope
+        self.limits = sorted(limits.items())
+        self.longest_window = max(limits)
+        self.db = db
+
+        # Users in order of last activity, least recent first
+        self._users: OrderedDict[int, _UserWindows] = OrderedDict()
+        self._loaded = db is None
+        self._load_lock = asyncio.Lock()
+        self._next_db_prune = 0.0
+
+    def _get_user(self, user_id, now: float) -> _UserWindows:
+        """Return a user's windows with expired requests dropped, marking them as active."""
+        user = self._users.get(user_id)
+        if user is None:
+            user = self._users[user_id] = _UserWindows(self.limits)
+        else:
+            self._users.move_to_end(user_id)
+        user.last_seen = now
+        for (window, _), requests in zip(self.limits, user.windows):
+            while requests and now - requests[0] >= window:
+                requests.popleft()
+        return user
+
+    def _evict_idle(self, now: float):
+        """Forget users with no requests inside any window."""
+        while self._users:
+            user_id, user = next(iter(self._users.items()))
+            if now - user.last_seen < self.longest_window:
+                break
+            del self._users[user_id]
+
+    def check(self, user_id, now: float | None = None) -> bool:
+        """Record a request for the user and return True, or return False if it is over a limit."""
+        now = time.time() if now is None else now
+        user = self._get_user(user_id, now)
+        self._evict_idle(now)
+
+        for (_, max_requests), requests in zip(self.limits, user.windows):
+            if len(requests) >= max_requests:
+                return False
+        for requests in user.windows:
+            requests.append(now)
+        return True
+
+    async def acquire(self, user_id) -> bool:
+        """Like `check`, but loads persisted requests first and persists accepted ones."""
+        await self._ensure_loaded()
+        now = time.time()
+        if not self.check(user_id, now):
+            return False
+
+        if self.db is not None:
+            await self.db.add_request(self.scope, user_id, now)
+            if now >= self._next_db_prune:
+                self._next_db_prune = now + self.DB_PRUNE_INTERVAL
+                await self.db.delete_requests_before(
+                    self.scope, now - self.longest_window
+                )
+        return True
+
+    async def _ensure_loaded(self):
+        """Replay requests persisted within the longest window, once."""
+        if self._loaded:
+            return
+        async with self._load_lock:
+            if self._loaded:
+                return
+            now = time.time()
+            rows = await self.db.get_requests_since(
+                self.scope, now - self.longest_window
+            )
+            for user_id, timestamp in rows or []:
+                user = self._get_user(user_id, timestamp)
+                for requests in user.windows:
+                    requests.append(timestamp)
+            self._loaded = True
+            logging.info(
+                f"Loaded {len(rows or [])} persisted requests for rate limiter {self.scope}"
+            )
@@ -0,0 +1,143 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import statistics
+import time
+from collections import Counter, deque
+from enum import IntEnum
+from typing import Optional
+
+# Error codes worth retrying after a pause: rate limited or temporarily unavailable
+RETRY_CODES = (429, 503)
+
+
+class Priority(IntEnum):
+    """Lower values are served first."""
+
+    COMMAND = 0
+    MENTION = 1
+
+
+def retry_delay(error) -> Optional[float]:
+    """Return the delay the API asked for before retrying, in seconds, if any."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        pass
+
+    # Google APIs report the delay as a RetryInfo detail, e.g. {"retryDelay": "7s"}
+    details = getattr(error, "details", None)
+    if isinstance(details, dict):
+        for detail in details.get("error", {}).get("details", []):
+            delay = detail.get("retryDelay") if isinstance(detail, dict) else None
+            if isinstance(delay, str) and delay.endswith("s"):
+                try:
+                    return float(delay[:-1])
+                except ValueError:
+                    pass
+    return None
+
+
+class RequestScheduler:
+    """Cap the number of concurrent requests to an API, serving waiters by priority.
+
+    Requests beyond `max_concurrent` wait in a priority queue (FIFO within a
+    priority). Requests failing with a code in RETRY_CODES are retried with
+    exponential backoff and full jitter, honouring any delay the API asks
+    for up to `max_delay`. The slot is held while backing off, so a
+    rate-limited API is not hit by the next waiter straight away.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int,
+        max_retries: int = 3,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0,
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self.in_flight = 0
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+
+        # Recent time spent waiting for a slot, in seconds
+        self.queue_times = deque(maxlen=500)
+        self.counters = Counter()
+
+    async def _acquire(self, priority: Priority):
+        if self.in_flight < self.max_concurrent and not self._waiters:
+            self.in_flight += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), waiter))
+        self.counters["queued"] += 1
+        try:
+            # The releasing task hands its slot over, so in_flight is unchanged
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self._release()
+            raise
+
+    def _release(self):
+        while self._waiters:
+            _, _, waiter = heapq.heappop(self._waiters)
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    async def run(self, request, priority: Priority = Priority.MENTION):
+        """Await `request()` once a slot is free, retrying it on RETRY_CODES errors."""
+        start = time.monotonic()
+        await self._acquire(priority)
+        waited = time.monotonic() - start
+        self.queue_times.append(waited)
+        if waited >= 1:
+            logging.info(f"Request waited {waited:.1f}s for a slot ({priority.name})")
+        self.counters["requests"] += 1
+        try:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    return await request()
+                except Exception as e:
+                    code = getattr(e, "code", None)
+                    if code not in RETRY_CODES or attempt == self.max_retries:
+                        raise
+                    delay = retry_delay(e)
+                    if delay is not None and delay > self.max_delay:
+                        # Waiting that long would be worse for the user than an error
+                        raise
+                    if delay is None:
+                        delay = random.uniform(
+                            0, min(self.max_delay, self.base_delay * 2**attempt)
+                        )
+                    self.counters["retries"] += 1
+                    logging.warning(
+                        f"Request failed with {code}, retrying in {delay:.1f}s "
+                        f"(attempt {attempt + 1}/{self.max_retries})"
+                    )
+                    await asyncio.sleep(delay)
+        finally:
+            self._release()
+
+    def stats(self) -> dict:
+        """Return a snapshot of the scheduler's load and queue times."""
+        stats = {
+            "in_flight": self.in_flight,
+            "waiting": len(self._waiters),
+            **self.counters,
+        }
+        if self.queue_times:
+            times = sorted(self.queue_times)
+            stats["queue_p50_ms"] = round(statistics.median(times) * 1000, 1)
+            stats["queue_p95_ms"] = round(times[int(0.95 * (len(times) - 1))] * 1000, 1)
+        return stats
@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import hashlib
+import re
+import time
+from collections import Counter, OrderedDict
+from typing import Optional
+
+from utils.lazy_import import lazy_import
+
+# numpy takes a while to import, so defer it until a response is first cached
+np = lazy_import("numpy")
+
+_NON_WORD = re.compile(r"[^\w]+")
+# Embeddings ignore these as stopwords, but they change what is being asked
+_QUESTION_WORDS = frozenset("what when where which who why how".split())
+
+
+def normalise_query(text: str) -> str:
+    """Lowercase `text` and reduce it to its words, so trivial rewordings share a key."""
+    return " ".join(_NON_WORD.sub(" ", text.casefold()).split())
+
+
+def question_words(normalised: str) -> frozenset:
+    """Return the interrogatives in a normalised query."""
+    return _QUESTION_WORDS.intersection(normalised.split())
+
+
+class _CachedResponse:
+    __slots__ = ("text", "vector", "question_words", "expires_at")
+
+    def __init__(
+        self,
+        text: str,
+        vector: Optional[np.ndarray],
+        question_words: frozenset,
+        expires_at: float,
+    ):
+        self.text = text
+        self.vector = vector
+        self.question_words = question_words
+        self.expires_at = expires_at
+
+
+class ResponseCache:
+    """An LRU cache of Gemini responses to repeated questions.
+
+    Entries are keyed by the normalised query and a fingerprint of everything
+    else the answer depends on (the CMS context sent with it and the FAQ
+    version), so they go stale as soon as the club's information changes.
+    If an `embedder` is given, a miss falls back to the most similar cached
+    query with the same fingerprint and interrogatives (so "when is X" never
+    answers "where is X"), provided its cosine similarity is at least
+    `similarity`.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        ttl: int = 6 * 3600,
+        embedder=None,
+        similarity: float = 0.9,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.embedder = embedder
+        self.similarity = similarity
+
+        self._entries: OrderedDict[tuple[str, str], _CachedResponse] = OrderedDict()
+        self.counters = Counter()
+
+    @staticmethod
+    def fingerprint(*parts) -> str:
+        """Return a short digest identifying the context an answer depends on."""
+        return hashlib.sha1("\0".join(map(str, parts)).encode()).hexdigest()
+
+    def get(self, query: str, fingerprint: str) -> Optional[str]:
+        """Return the cached response for `query` under `fingerprint`, or None on a miss."""
+        now = time.time()
+        key = (fingerprint, normalise_query(query))
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at <= now:
+            del self._entries[key]
+            entry = None
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.counters["hits"] += 1
+            return entry.text
+
+        if self.embedder is not None and key[1]:
+            vector = self.embedder.embed(key[1])
+            asked = question_words(key[1])
+            best_key, best_score = None, self.similarity
+            for other_key, other in self._entries.items():
+                if (
+                    other_key[0] != fingerprint
+                    or other.vector is None
+                    or other.question_words != asked
+                    or other.expires_at <= now
+                ):
+                    continue
+                score = float(np.dot(vector, other.vector))
+                if score >= best_score:
+                    best_key, best_score = other_key, score
+            if best_key is not None:
+                self._entries.move_to_end(best_key)
+                self.counters["similar_hits"] += 1
+                return self._entries[best_key].text
+
+        self.counters["misses"] += 1
+        return None
+
+    def put(self, query: str, fingerprint: str, response: str):
+        """Cache `response` as the answer to `query` under `fingerprint`."""
+        normalised = normalise_query(query)
+        vector = (
+            self.embedder.embed(normalised)
+            if self.embedder is not None and normalised
+            else None
+        )
+        key = (fingerprint, normalised)
+        self._entries[key] = _CachedResponse(
+            response, vector, question_words(normalised), time.time() + self.ttl
+        )
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def prune(self) -> int:
+        """Drop expired responses, returning how many were dropped."""
+        now = time.time()
+        expired = [
+            key for key, entry in self._entries.items() if entry.expires_at <= now
+        ]
+        for key in expired:
+            del self._entries[key]
+        return len(expired)
+
+    def clear(self):
+        """Drop every cached response."""
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        """Return the cache size and hit counts."""
+        lookups = (
+            self.counters["hits"]
+            + self.counters["similar_hits"]
+            + self.counters["misses"]
+        )
+        hits = self.counters["hits"] + self.counters["similar_hits"]
+        return {
+            "entries": len(self._entries),
+            **self.counters,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+        }
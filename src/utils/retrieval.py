@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import math
+import re
+import zlib
+from collections import Counter
+from pathlib import Path
+from typing import Optional
+
+from utils.lazy_import import lazy_import
+
+# numpy takes a while to import, so defer it until an index is first built or searched
+np = lazy_import("numpy")
+
+STOPWORDS = frozenset(
+    "a an and are as at be but by can do does for from how i if in is it me my "
+    "of on or so that the their there this to was what when where which who "
+    "why will with you your".split()
+)
+
+
+class HashingEmbedder:
+    """Embed text locally by hashing word and character trigram features.
+
+    No model download or network call is needed, and the hash is stable across
+    processes, so embeddings can be computed once and persisted to disk.
+    """
+
+    def __init__(self, dim: int = 1024, trigram_weight: float = 0.5):
+        self.dim = dim
+        self.trigram_weight = trigram_weight
+
+    @property
+    def signature(self) -> str:
+        """Identifies the embedding configuration, so persisted indexes are rebuilt when it changes."""
+        return f"hashing-v1:{self.dim}:{self.trigram_weight}"
+
+    def _features(self, text: str) -> Counter:
+        """Count the weighted word and character trigram features of `text`."""
+        features = Counter()
+        for word in re.findall(r"\w+", text.lower()):
+            if word in STOPWORDS:
+                continue
+            features[f"w:{word}"] += 1.0
+            padded = f"#{word}#"
+            for i in range(len(padded) - 2):
+                features[f"c:{padded[i : i + 3]}"] += self.trigram_weight
+        return features
+
+    def embed(self, text: str) -> np.ndarray:
+        """Return the L2-normalised embedding of `text` (all zeros if it has no features)."""
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for feature, weight in self._features(text).items():
+            h = zlib.crc32(feature.encode())
+            # Use one hash bit for the sign so colliding features tend to cancel out
+            sign = 1.0 if h & 0x80000000 else -1.0
+            vec[h % self.dim] += sign * (1.0 + math.log(weight))
+        norm = np.linalg.norm(vec)
+        if norm > 0:
+            vec /= norm
+        return vec
+
+    def embed_many(self, texts: list[str]) -> np.ndarray:
+        """Return an (n, dim) matrix of embeddings for `texts`."""
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            matrix[i] = self.embed(text)
+        return matrix
+
+
+class VectorIndex:
+    """Top-k cosine similarity search over a fixed set of documents."""
+
+    def __init__(self, documents: list[str], matrix: np.ndarray, embedder):
+        self.documents = documents
+        self.matrix = matrix
+        self.embedder = embedder
+
+    def __len__(self):
+        return len(self.documents)
+
+    @classmethod
+    def build(
+        cls, documents: list[str], embedder, texts: Optional[list[str]] = None
+    ) -> VectorIndex:
+        """Embed `texts` (defaults to `documents`) and index them against `documents`."""
+        texts = documents if texts is None else texts
+        return cls(list(documents), embedder.embed_many(texts), embedder)
+
+    @classmethod
+    def load_or_build(
+        cls,
+        documents: list[str],
+        embedder,
+        path: Path,
+        texts: Optional[list[str]] = None,
+    ) -> VectorIndex:
+        """Load a persisted index from `path`, rebuilding it if the documents or embedder changed.
+
+        The matrix is stored as `<path>.npy` and memory-mapped on load, with the
+        documents and a fingerprint of the inputs stored alongside in `<path>.json`.
+        """
+        texts = documents if texts is None else texts
+        fingerprint = hashlib.sha256(
+            json.dumps([embedder.signature, documents, texts]).encode()
+        ).hexdigest()
+        matrix_path = path.with_suffix(".npy")
+        meta_path = path.with_suffix(".json")
+
+        try:
+            meta = json.loads(meta_path.read_text())
+            if meta.get("fingerprint") == fingerprint:
+                matrix = np.load(matrix_path, mmap_mode="r")
+                return cls(meta["documents"], matrix, embedder)
+        except FileNotFoundError:
+            pass
+        except Exception:
+            logging.exception(f"Failed to load vector index from {path}, rebuilding")
+
+        index = cls.build(documents, embedder, texts)
+        try:
+            np.save(matrix_path, index.matrix)
+            meta_path.write_text(
+                json.dumps({"fingerprint": fingerprint, "documents": documents})
+            )
+            index.matrix = np.load(matrix_path, mmap_mode="r")
+        except Exception:
+            logging.exception(f"Failed to persist vector index to {path}")
+        return index
+
+    def search(
+        self, query: str, k: int = 4, min_score: float = 0.0
+    ) -> list[tuple[float, str]]:
+        """Return up to `k` (score, document) pairs with cosine similarity of at least `min_score`."""
+        if not self.documents or k <= 0:
+            return []
+        scores = self.matrix @ self.embedder.embed(query)
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            (float(scores[i]), self.documents[i]) for i in top if scores[i] >= min_score
+        ]
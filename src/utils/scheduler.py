@@ -0,0 +1,195 @@
+import asyncio
+import logging
+import random
+from datetime import datetime, time, timedelta, timezone, tzinfo
+from typing import Awaitable, Callable, Optional
+from zoneinfo import ZoneInfo
+
+ADELAIDE_TZ = ZoneInfo("Australia/Adelaide")
+
+# Returns when a job should next run, given the current (aware) time
+NextRun = Callable[[datetime], datetime]
+
+
+def every(seconds: float) -> NextRun:
+    """Run a job at a fixed interval."""
+    interval = timedelta(seconds=seconds)
+    return lambda now: now + interval
+
+
+def daily_at(hour: int, minute: int = 0, tz: tzinfo = ADELAIDE_TZ) -> NextRun:
+    """Run a job once a day at the wall clock time hour:minute in `tz` (a zoneinfo timezone).
+
+    The next date is found in local time and then localised, so runs stay at
+    the same local time across daylight saving changes (a day may be 23 or 25
+    hours long). A time skipped by a change runs at the equivalent instant
+    after it instead.
+    """
+    at = time(hour, minute)
+
+    def next_run(now: datetime) -> datetime:
+        local_now = now.astimezone(tz)
+        candidate = datetime.combine(local_now.date(), at, tzinfo=tz)
+        if candidate <= local_now:
+            candidate = datetime.combine(
+                local_now.date() + timedelta(days=1), at, tzinfo=tz
+            )
+        return candidate
+
+    return next_run
+
+
+class _Job:
+    __slots__ = (
+        "name",
+        "func",
+        "next_run",
+        "jitter",
+        "run_immediately",
+        "task",
+        "next_at",
+        "last_run",
+        "last_duration",
+        "runs",
+        "failures",
+        "restarts",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[], Awaitable],
+        next_run: NextRun,
+        jitter: float,
+        run_immediately: bool,
+    ):
+        self.name = name
+        self.func = func
+        self.next_run = next_run
+        self.jitter = jitter
+        self.run_immediately = run_immediately
+        self.task: Optional[asyncio.Task] = None
+        self.next_at: Optional[datetime] = None
+        self.last_run: Optional[datetime] = None
+        self.last_duration = 0.0
+        self.runs = 0
+        self.failures = 0
+        self.restarts = 0
+
+
+class Scheduler:
+    """Runs periodic background jobs at precise times.
+
+    Each job sleeps until its next run time instead of polling, so the bot does
+    no work between runs. Sleeps are capped at `max_sleep` seconds and the
+    remaining time is recomputed from the wall clock after each one, which
+    corrects for clock adjustments and suspends. A failing job is logged and
+    rescheduled as usual, and if a job's runner itself crashes it is restarted
+    after `restart_delay` seconds.
+    """
+
+    def __init__(self, max_sleep: float = 3600, restart_delay: float = 30):
+        self.max_sleep = max_sleep
+        self.restart_delay = restart_delay
+        self.jobs: dict[str, _Job] = {}
+        self.running = False
+
+    def add_job(
+        self,
+        name: str,
+        func: Callable[[], Awaitable],
+        next_run: NextRun,
+        jitter: float = 0,
+        run_immediately: bool = False,
+    ):
+        """Register coroutine function `func` to run at the times given by `next_run`.
+
+        Each run is delayed by a random 0 to `jitter` seconds. If
+        `run_immediately` is set, the job also runs once when the scheduler
+        starts.
+        """
+        if name in self.jobs:
+            raise ValueError(f"A job named {name} is already scheduled")
+        job = self.jobs[name] = _Job(name, func, next_run, jitter, run_immediately)
+        if self.running:
+            self._start_job(job)
+
+    def start(self):
+        """Start every registered job. Must be called from the event loop."""
+        if self.running:
+            return
+        self.running = True
+        for job in self.jobs.values():
+            self._start_job(job)
+
+    async def stop(self):
+        """Cancel every job and wait for them to finish."""
+        self.running = False
+        tasks = [job.task for job in self.jobs.values() if job.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for job in self.jobs.values():
+            job.task = None
+
+    def _start_job(self, job: _Job):
+        job.task = asyncio.create_task(self._run(job), name=f"scheduler:{job.name}")
+        job.task.add_done_callback(lambda task: self._on_done(job, task))
+
+    def _on_done(self, job: _Job, task: asyncio.Task):
+        if task.cancelled() or not self.running:
+            return
+        logging.error(
+            f"Scheduler job {job.name} crashed, restarting in {self.restart_delay}s",
+            exc_info=task.exception(),
+        )
+        job.restarts += 1
+        job.task = None
+        asyncio.get_running_loop().call_later(self.restart_delay, self._restart, job)
+
+    def _restart(self, job: _Job):
+        if self.running and job.task is None:
+            self._start_job(job)
+
+    async def _run(self, job: _Job):
+        if job.run_immediately and job.runs == 0 and job.restarts == 0:
+            await self._run_once(job)
+        while True:
+            now = datetime.now(timezone.utc)
+            job.next_at = job.next_run(now) + timedelta(
+                seconds=random.uniform(0, job.jitter)
+            )
+            while (
+                remaining := (job.next_at - datetime.now(timezone.utc)).total_seconds()
+            ) > 0:
+                await asyncio.sleep(min(remaining, self.max_sleep))
+            await self._run_once(job)
+
+    async def _run_once(self, job: _Job):
+        loop = asyncio.get_running_loop()
+        job.last_run = datetime.now(timezone.utc)
+        start = loop.time()
+        try:
+            await job.func()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            job.failures += 1
+            logging.exception(f"Scheduler job {job.name} failed")
+        finally:
+            job.runs += 1
+            job.last_duration = loop.time() - start
+
+    def stats(self) -> dict:
+        """Return the schedule and run counts of every job."""
+        return {
+            name: {
+                "next_run": job.next_at.isoformat() if job.next_at else None,
+                "last_run": job.last_run.isoformat() if job.last_run else None,
+                "last_duration": round(job.last_duration, 3),
+                "runs": job.runs,
+                "failures": job.failures,
+                "restarts": job.restarts,
+            }
+            for name, job in self.jobs.items()
+        }
@@ -1,4 +1,5 @@
 import datetime
+import logging
 import os
 import re
 
@@ -8,12 +9,17 @@ import Levenshtein
 from dotenv import load_dotenv
 
 from models.databases.admin_settings_db import AdminSettingsDB
+from utils.metrics import registry
 
 # Load environment variables from .env file
 load_dotenv()
 CMS_URL = os.getenv("CMS_URL")
 KNOWN_SPAM_MESSAGES_URL = f"{CMS_URL}/api/known-spam-messages?limit=500"
 
+SPAM_CHECKS = registry.counter(
+    "duckbot_spam_checks_total", "Messages checked for spam, by verdict", ("result",)
+)
+
 
 async def fetch_spam_messages():
     """
@@ -47,7 +53,7 @@ async def fetch_spam_messages():
                     fetch_spam_messages._cache_time = now
                     return messages
     except Exception as e:
-        print(f"Failed to fetch spam messages from CMS: {e}")
+        logging.error(f"Failed to fetch spam messages from CMS: {e}")
 
     # Fallback to empty list if fetch fails
     fetch_spam_messages._cached_spam_messages = []
@@ -177,14 +183,15 @@ async def check_spam(message, settings_db=None):
     input_message = message.content
     spam_messages = await fetch_spam_messages()
     is_spam_flag = is_spam(input_message, spam_messages)
+    SPAM_CHECKS.labels("spam" if is_spam_flag else "clean").inc()
 
     # If the message is spam, take action
     if is_spam_flag:
         try:
             # Try to delete the spam message
             await message.delete()
-        except Exception as e:
-            print(f"An error occurred: {e}")
+        except Exception:
+            logging.exception(f"Failed to delete spam message {message.id}")
 
         member = message.author
 
@@ -193,7 +200,7 @@ async def check_spam(message, settings_db=None):
         member_top_role = member.top_role
 
         if member_top_role >= bot_role:
-            print(
+            logging.warning(
                 f"Cannot timeout {member.display_name}: Their role is higher or equal to the bot's role."
             )
             return
@@ -203,11 +210,11 @@ async def check_spam(message, settings_db=None):
             await member.timeout(
                 datetime.timedelta(days=1), reason="Sending spam messages"
             )
-            print(
+            logging.info(
                 f"User {member} has been timed out for 1 day for sending spam messages."
             )
-        except Exception as e:
-            print(f"An error occurred: {e}")
+        except Exception:
+            logging.exception(f"Failed to timeout {member} for sending spam messages")
 
         # Log the spam message using the configured global `LOG_CHANNEL_ID` stored in DB
         try:
@@ -245,5 +252,5 @@ async def check_spam(message, settings_db=None):
 
             # Send the embed to the log channel
             await log_channel_obj.send(embed=embed)
-        except Exception as e:
-            print(f"An error occurred while logging the spam message: {e}")
+        except Exception:
+            logging.exception("An error occurred while logging the spam message")
@@ -0,0 +1,136 @@
+import logging
+import os
+import sys
+import threading
+import time
+from typing import Optional
+
+# Set STARTUP_PROFILE=true to time every import and log a startup report once ready
+STARTUP_PROFILE = os.environ.get("STARTUP_PROFILE", "false").lower() == "true"
+
+
+def process_age() -> Optional[float]:
+    """Return the seconds since this process started, if the platform exposes it."""
+    try:
+        with open("/proc/self/stat") as f:
+            # The command name may contain spaces, so split after its closing parenthesis
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class ImportTimer:
+    """A meta path finder recording how long each module takes to execute.
+
+    Each module's loader is wrapped as it is found, recording its cumulative
+    time and its self time (excluding the imports it triggers), like
+    `python -X importtime`.
+    """
+
+    def __init__(self):
+        # (module name, self seconds, cumulative seconds), in completion order
+        self.imports: list[tuple[str, float, float]] = []
+        self._local = threading.local()
+
+    def install(self):
+        if self not in sys.meta_path:
+            sys.meta_path.insert(0, self)
+
+    def uninstall(self):
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is None:
+                continue
+            loader = spec.loader
+            # Built-in and frozen importers are shared classes, so only wrap loader instances
+            if (
+                loader is not None
+                and not isinstance(loader, type)
+                and hasattr(loader, "exec_module")
+            ):
+                loader.exec_module = self._timed(fullname, loader.exec_module)
+            return spec
+        return None
+
+    def _timed(self, name: str, exec_module):
+        def timed_exec_module(module):
+            stack = self._local.__dict__.setdefault("stack", [])
+            stack.append(0.0)
+            start = time.perf_counter()
+            try:
+                exec_module(module)
+            finally:
+                elapsed = time.perf_counter() - start
+                children = stack.pop()
+                if stack:
+                    stack[-1] += elapsed
+                self.imports.append((name, elapsed - children, elapsed))
+
+        return timed_exec_module
+
+
+class StartupProfiler:
+    """Record the time taken by each startup phase, from process start to ready."""
+
+    def __init__(self):
+        now = time.perf_counter()
+        age = process_age()
+        # Fall back to when this module was imported if the process start is unknown
+        self.start = now - age if age is not None else now
+        self.phases: list[tuple[str, float]] = []
+        self.import_timer: Optional[ImportTimer] = None
+        self.reported = False
+
+    def enable_import_timing(self):
+        self.import_timer = ImportTimer()
+        self.import_timer.install()
+
+    def mark(self, phase: str):
+        """Record that `phase` has just finished."""
+        self.phases.append((phase, time.perf_counter()))
+
+    def elapsed(self) -> float:
+        """Return the seconds from process start to the latest phase."""
+        return (self.phases[-1][1] if self.phases else time.perf_counter()) - self.start
+
+    def report(self, top: int = 15) -> str:
+        """Return the phase timings and the slowest imports as text."""
+        lines = ["Startup profile:"]
+        previous = self.start
+        for phase, at in self.phases:
+            lines.append(
+                f"  {phase:<24} +{(at - previous) * 1000:8.1f} ms  "
+                f"(at {(at - self.start) * 1000:8.1f} ms)"
+            )
+            previous = at
+        if self.import_timer is not None and self.import_timer.imports:
+            imports = self.import_timer.imports
+            lines.append(
+                f"Slowest of {len(imports)} imports (self ms / cumulative ms):"
+            )
+            for name, own, cumulative in sorted(imports, key=lambda i: -i[1])[:top]:
+                lines.append(f"  {own * 1000:8.1f} {cumulative * 1000:8.1f}  {name}")
+        return "\n".join(lines)
+
+    def log_report(self):
+        """Log the report once, stopping import timing."""
+        if self.reported:
+            return
+        self.reported = True
+        if self.import_timer is not None:
+            self.import_timer.uninstall()
+        logging.info(self.report())
+
+
+profiler = StartupProfiler()
+if STARTUP_PROFILE:
+    profiler.enable_import_timing()
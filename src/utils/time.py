@@ -1,28 +1,71 @@
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
 
 import pytz
 
 # Adelaide timezone (UTC+9:30)
 tz = pytz.timezone("Australia/Adelaide")
+# The same zone via zoneinfo, whose transition table makes conversions much cheaper
+zone = ZoneInfo("Australia/Adelaide")
+
+# Day numbers count whole days since this epoch. pytz gives it the zone's local
+# mean time offset (+09:14) rather than ACST, so a day begins at the same UTC
+# instant all year round and daylight saving never moves it
+EPOCH = datetime(1970, 1, 1, tzinfo=tz)
+EPOCH_UTC = EPOCH.astimezone(timezone.utc)
+DAY_OFFSET = int(-EPOCH.timestamp())  # seconds from the epoch back to 1970-01-01 UTC
+SECONDS_PER_DAY = 86400
+
+# Discord snowflakes hold milliseconds since this instant above bit 22
+DISCORD_EPOCH_MS = 1420070400000
+_SNOWFLAKE_DAY_OFFSET_MS = DISCORD_EPOCH_MS + DAY_OFFSET * 1000
+_MS_PER_DAY = SECONDS_PER_DAY * 1000
+
+
+def _localize(timestamp: datetime) -> datetime:
+    """Attach the Adelaide zone to a naive local time, like `tz.localize`.
+
+    Times repeated or skipped by a daylight saving change are read as standard
+    time, which is the smaller of the two candidate offsets.
+    """
+    first = timestamp.replace(tzinfo=zone, fold=0)
+    second = timestamp.replace(tzinfo=zone, fold=1)
+    return first if first.utcoffset() <= second.utcoffset() else second
 
 
 def get_current_day():
     """Generates a numerical value for each day"""
-    now = datetime.now(tz)
-    epoch = datetime(1970, 1, 1, tzinfo=tz)
-    days_since_epoch = (now - epoch).days
-    return days_since_epoch
+    return (datetime.now(timezone.utc) - EPOCH_UTC).days
 
 
 def get_day_from_timestamp(timestamp: datetime):
-    """Generates the numerical value of a day given a timestamp"""
+    """Generates the numerical value of a day given a timestamp (naive timestamps are Adelaide time)"""
     if timestamp.tzinfo is None:
-        timestamp = tz.localize(timestamp)
-    else:
-        timestamp = timestamp.astimezone(tz)
-    epoch = datetime(1970, 1, 1, tzinfo=tz)
-    days_since_epoch = (timestamp - epoch).days
-    return days_since_epoch
+        timestamp = _localize(timestamp)
+    return (timestamp - EPOCH_UTC).days
+
+
+def get_day_from_epoch_seconds(seconds):
+    """Generates the numerical value of a day given seconds since 1970-01-01 UTC.
+    Also accepts a numpy array, returning an array of days (integers for integer input)."""
+    return (seconds + DAY_OFFSET) // SECONDS_PER_DAY
+
+
+def get_day_from_snowflake(snowflake):
+    """Generates the numerical value of the day a Discord id (message, user, ...) was created.
+    Also accepts a numpy int64 array of ids, returning an array of days."""
+    return ((snowflake >> 22) + _SNOWFLAKE_DAY_OFFSET_MS) // _MS_PER_DAY
+
+
+def get_day_start(day: int) -> datetime:
+    """Returns the moment the given numerical day begins"""
+    return EPOCH + timedelta(days=day)
+
+
+def get_next_day_start(now: datetime | None = None) -> datetime:
+    """Returns the moment the numerical day after `now` (default: the current time) begins"""
+    now = datetime.now(tz) if now is None else now
+    return get_day_start(get_day_from_timestamp(now) + 1)
 
 
 def get_timestamp_str(timestamp: datetime = datetime.now()):
@@ -0,0 +1,47 @@
+from typing import Optional
+
+
+class TokenEstimator:
+    """Estimate Gemini token counts locally, without a count_tokens round-trip.
+
+    Gemini's SentencePiece tokenizer falls back to bytes, so a text never has
+    more tokens than UTF-8 bytes; that bound alone settles most Discord
+    messages. Otherwise the estimate assumes ~4 characters per token for ASCII
+    text and one token per non-ASCII character (CJK, emoji), which overcounts
+    accented Latin text. Estimates within `margin` of the limit are reported
+    as borderline so the caller can ask the API for an exact count.
+    """
+
+    def __init__(
+        self,
+        chars_per_token: float = 4.0,
+        non_ascii_tokens_per_char: float = 1.0,
+        margin: float = 0.25,
+    ):
+        self.chars_per_token = chars_per_token
+        self.non_ascii_tokens_per_char = non_ascii_tokens_per_char
+        self.margin = margin
+
+    def estimate(self, text: str) -> int:
+        """Return the estimated number of tokens in `text`."""
+        if text.isascii():
+            return round(len(text) / self.chars_per_token)
+        ascii_chars = sum(1 for c in text if c < "\x80")
+        non_ascii_chars = len(text) - ascii_chars
+        return round(
+            ascii_chars / self.chars_per_token
+            + non_ascii_chars * self.non_ascii_tokens_per_char
+        )
+
+    def within_limit(self, text: str, limit: int) -> Optional[bool]:
+        """Return True if `text` is certainly within `limit` tokens, False if it is
+        certainly over, or None if it is too close to call locally."""
+        # Byte-fallback tokenisation never yields more than one token per byte
+        if len(text.encode()) <= limit:
+            return True
+        estimate = self.estimate(text)
+        if estimate * (1 + self.margin) <= limit:
+            return True
+        if estimate * (1 - self.margin) > limit:
+            return False
+        return None
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from functools import lru_cache
+from typing import Iterable, Optional
+
+import Levenshtein
+
+# Insertion, deletion and substitution costs. Counting a substitution as a deletion
+# plus an insertion gives the indel distance, which keeps similarity in line with
+# difflib's ratio while still being a metric for the BK-tree.
+INDEL_WEIGHTS = (1, 1, 2)
+
+
+def indel_distance(a: str, b: str) -> int:
+    """Return the number of single-character insertions and deletions turning a into b."""
+    return Levenshtein.distance(a, b, weights=INDEL_WEIGHTS)
+
+
+class BKTree:
+    """A Burkhard-Keller tree for bounded indel-distance lookups over a set of words."""
+
+    def __init__(self, words: Iterable[str] = ()):
+        # Each node is (word, {distance to parent: child node})
+        self._root: Optional[tuple[str, dict]] = None
+        for word in words:
+            self.add(word)
+
+    def add(self, word: str):
+        """Insert `word` into the tree (duplicates are ignored)."""
+        if self._root is None:
+            self._root = (word, {})
+            return
+        node = self._root
+        while True:
+            dist = indel_distance(word, node[0])
+            if dist == 0:
+                return
+            child = node[1].get(dist)
+            if child is None:
+                node[1][dist] = (word, {})
+                return
+            node = child
+
+    def search(self, word: str, radius: int) -> list[tuple[int, str]]:
+        """Return (distance, word) pairs for all words within `radius` of `word`."""
+        if self._root is None:
+            return []
+        results = []
+        stack = [self._root]
+        while stack:
+            node_word, children = stack.pop()
+            dist = indel_distance(word, node_word)
+            if dist <= radius:
+                results.append((dist, node_word))
+            # Triangle inequality: only subtrees in [dist - radius, dist + radius] can match
+            for child_dist, child in children.items():
+                if dist - radius <= child_dist <= dist + radius:
+                    stack.append(child)
+        return results
+
+
+class TopicRouter:
+    """Classify message tokens into topics using exact and typo-tolerant keyword matches.
+
+    A token matches a keyword exactly, or fuzzily when their similarity
+    (1 - indel distance / combined length, as in difflib) is at least `cutoff`.
+    Lookups are memoised per token, so repeated words cost a single dict hit.
+    """
+
+    def __init__(
+        self, topics: dict[str, Iterable[str]], cutoff: float = 0.8, cache_size=4096
+    ):
+        self.cutoff = cutoff
+        self.topics = frozenset(topics)
+
+        keyword_topics = defaultdict(set)
+        for topic, keywords in topics.items():
+            for keyword in keywords:
+                keyword_topics[keyword.lower()].add(topic)
+        self._keyword_topics = {k: frozenset(v) for k, v in keyword_topics.items()}
+        self._tree = BKTree(self._keyword_topics)
+        self._token_topics = lru_cache(maxsize=cache_size)(self._lookup)
+
+    def _max_distance(self, total_length: int) -> int:
+        """Largest indel distance allowed between two words of `total_length` characters."""
+        return int((1 - self.cutoff) * total_length + 1e-9)
+
+    def _lookup(self, token: str) -> frozenset[str]:
+        """Return the topics a single lowercase token belongs to."""
+        exact = self._keyword_topics.get(token)
+        if exact is not None:
+            return exact
+
+        # Bound on the distance to any keyword passing the cutoff, whatever its length
+        radius = int(2 * (1 - self.cutoff) * len(token) / self.cutoff + 1e-9)
+        if radius == 0:
+            return frozenset()
+
+        matched = set()
+        for dist, keyword in self._tree.search(token, radius):
+            if dist <= self._max_distance(len(token) + len(keyword)):
+                matched |= self._keyword_topics[keyword]
+        return frozenset(matched)
+
+    def classify(self, tokens: Iterable[str]) -> set[str]:
+        """Return every topic matched by any of the lowercase `tokens`."""
+        matched = set()
+        for token in tokens:
+            matched |= self._token_topics(token)
+            if len(matched) == len(self.topics):
+                break
+        return matched
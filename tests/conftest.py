@@ -0,0 +1,65 @@
+import os
+from types import SimpleNamespace
+
+import pytest
+
+# Read by commands.gemini when it is imported
+os.environ.setdefault("REQUESTS_PER_MINUTE", "3")
+
+from commands import gemini  # noqa: E402
+
+
+class StubCaches:
+    def __init__(self):
+        self.created = []
+        self.deleted = []
+
+    async def create(self, model, config):
+        name = f"cachedContents/{len(self.created)}"
+        self.created.append(name)
+        return SimpleNamespace(name=name)
+
+    async def update(self, name, config):
+        pass
+
+    async def delete(self, name):
+        self.deleted.append(name)
+
+
+class StubModels:
+    """Answers every request, after raising each of `failures` in turn."""
+
+    def __init__(self):
+        self.failures = []
+        self.configs = []
+        self.contents = []
+
+    async def generate_content(self, model, contents, config):
+        self.configs.append(config)
+        self.contents.append(contents)
+        if self.failures:
+            raise self.failures.pop(0)
+        return SimpleNamespace(text="Quack", usage_metadata=None)
+
+    async def generate_content_stream(self, model, contents, config):
+        response = await self.generate_content(model, contents, config)
+
+        async def chunks():
+            for word in ("Qu", "ack"):
+                yield SimpleNamespace(text=word, usage_metadata=response.usage_metadata)
+
+        return chunks()
+
+
+class StubClient:
+    def __init__(self, api_key=None):
+        self.aio = SimpleNamespace(caches=StubCaches(), models=StubModels())
+
+
+@pytest.fixture
+def bot(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(gemini.genai, "Client", StubClient)
+    faq = tmp_path / "faq.csv"
+    faq.write_text("When is the next meeting?,Check the events channel.\n")
+    return gemini.GeminiBot("gemini-test", str(faq), bot=None, api_key="")
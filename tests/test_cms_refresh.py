@@ -0,0 +1,24 @@
+from utils import cms, gemini_rag
+
+
+def test_refresh_covers_every_key_the_rag_context_reads(monkeypatch):
+    fetches = []
+
+    def fetch(endpoint, params=None):
+        fetches.append((endpoint, params))
+        return {"docs": [], "page": 1, "totalPages": 1, "totalDocs": 0}
+
+    monkeypatch.setattr(cms, "_fetch_from_cms", fetch)
+    for name in ("_memory_cache", "_cache_times", "_cache_versions"):
+        monkeypatch.setattr(cms, name, {})
+
+    cms.refresh_cache()
+    for _, cache_key, _ in gemini_rag.TOPICS.values():
+        assert not cms.is_cache_stale(cache_key), cache_key
+    assert not cms.is_cache_stale("common_events")
+
+    # Building the context afterwards is served from the cache
+    fetches.clear()
+    for _, _, render in gemini_rag.TOPICS.values():
+        render()
+    assert fetches == []
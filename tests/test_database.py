@@ -0,0 +1,58 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from models.database import Database
+
+
+def make_db(tmp_path):
+    return Database(
+        ["CREATE TABLE IF NOT EXISTS items (id INTEGER PRIMARY KEY)"],
+        "test.sqlite",
+        db_folder=tmp_path,
+    )
+
+
+def test_execute_opens_the_database_on_first_use(tmp_path):
+    async def scenario():
+        db = make_db(tmp_path)
+        await db.execute("INSERT INTO items (id) VALUES (?)", (1,))
+        rows = await db.execute("SELECT id FROM items", fetch="all")
+        await db.close()
+        return rows
+
+    assert asyncio.run(scenario()) == [(1,)]
+
+
+def test_closed_database_is_not_reopened(tmp_path):
+    async def scenario():
+        db = make_db(tmp_path)
+        await db.open()
+        # Statements queued behind close() must not reopen the connection
+        pending = asyncio.gather(
+            db.close(),
+            db.execute("SELECT id FROM items"),
+            return_exceptions=True,
+        )
+        _, error = await pending
+        with pytest.raises(sqlite3.ProgrammingError):
+            await db.execute("SELECT id FROM items")
+        return db, error
+
+    db, error = asyncio.run(scenario())
+    assert isinstance(error, sqlite3.ProgrammingError)
+    assert db.connection is None
+
+
+def test_open_after_close_reopens(tmp_path):
+    async def scenario():
+        db = make_db(tmp_path)
+        await db.open()
+        await db.close()
+        await db.open()
+        rows = await db.execute("SELECT id FROM items", fetch="all")
+        await db.close()
+        return rows
+
+    assert asyncio.run(scenario()) == []
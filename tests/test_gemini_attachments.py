@@ -0,0 +1,42 @@
+import asyncio
+from types import SimpleNamespace
+
+from aiohttp import web
+
+from commands import gemini
+
+
+async def serve(status: int, body: bytes = b""):
+    async def handle(request):
+        return web.Response(status=status, body=body)
+
+    app = web.Application()
+    app.router.add_get("/attachment.png", handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}/attachment.png"
+
+
+def upload(status: int, body: bytes = b""):
+    async def scenario():
+        runner, url = await serve(status, body)
+        attachment = SimpleNamespace(url=url, filename="attachment.png")
+        try:
+            return await gemini.upload_or_return_file_ref(attachment, None, None)
+        finally:
+            await runner.cleanup()
+
+    return asyncio.run(scenario())
+
+
+def test_failed_download_is_not_reported_as_a_gemini_error():
+    assert upload(404) == (None, gemini.Errors.ATTACHMENT_DOWNLOAD_ERR)
+    assert upload(500) == (None, gemini.Errors.ATTACHMENT_DOWNLOAD_ERR)
+
+
+def test_oversized_download_is_rejected(monkeypatch):
+    monkeypatch.setattr(gemini, "MAX_ATTACHMENT_SIZE", 10)
+    assert upload(200, b"x" * 100) == (None, gemini.Errors.FILE_SIZE_ERR)
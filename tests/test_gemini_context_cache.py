@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+from google.genai import errors
+
+
+async def ask(bot):
+    response = await bot.generate_content(["INPUT:hello ANSWER:"], "hello")
+    # Let scheduled cache deletions run
+    await asyncio.sleep(0)
+    return response
+
+
+def api_error(code, message):
+    return errors.APIError(code, {"error": {"code": code, "message": message}})
+
+
+def test_cache_hit(bot):
+    async def scenario():
+        await ask(bot)
+        await ask(bot)
+
+    asyncio.run(scenario())
+    caches = bot.client.aio.caches
+    configs = bot.client.aio.models.configs
+    assert caches.created == ["cachedContents/0"]
+    assert [config.cached_content for config in configs] == ["cachedContents/0"] * 2
+    assert caches.deleted == []
+
+
+def test_falls_back_without_cache_after_404(bot):
+    bot.client.aio.models.failures = [api_error(404, "CachedContent not found")]
+
+    response = asyncio.run(ask(bot))
+    configs = bot.client.aio.models.configs
+    assert response.text == "Quack"
+    assert configs[0].cached_content == "cachedContents/0"
+    assert configs[1].cached_content is None
+    assert configs[1].system_instruction == bot.system_instruction
+    assert bot.context_cache.name is None
+    assert bot.client.aio.caches.deleted == ["cachedContents/0"]
+
+
+def test_falls_back_after_400_about_cached_content(bot):
+    bot.client.aio.models.failures = [
+        api_error(400, "cached_content is not supported by this model")
+    ]
+
+    asyncio.run(ask(bot))
+    assert [c.cached_content for c in bot.client.aio.models.configs] == [
+        "cachedContents/0",
+        None,
+    ]
+
+
+def test_other_400_is_raised_without_retrying(bot):
+    bot.client.aio.models.failures = [api_error(400, "Invalid image data")]
+
+    with pytest.raises(errors.APIError):
+        asyncio.run(ask(bot))
+    assert len(bot.client.aio.models.configs) == 1
+    assert bot.context_cache.name == "cachedContents/0"
+    assert bot.client.aio.caches.deleted == []
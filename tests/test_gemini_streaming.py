@@ -0,0 +1,17 @@
+import asyncio
+
+
+def test_streamed_response_records_time_to_first_token(bot):
+    partial = []
+
+    async def on_text(text):
+        partial.append(text)
+
+    assert bot.ttft_stats() == {}
+    response = asyncio.run(bot.generate_content(["INPUT:hi ANSWER:"], "hi", on_text))
+
+    assert response.text == "Quack"
+    assert partial == ["Qu", "Quack"]
+    stats = bot.ttft_stats()
+    assert stats["samples"] == 1
+    assert stats["ttft_p50_ms"] >= 0
@@ -0,0 +1,26 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parent.parent / "src"
+HEAVY_MODULES = ("numpy", "matplotlib", "google.genai")
+
+
+def test_importing_main_defers_heavy_dependencies(tmp_path):
+    # A fresh interpreter, since the test session may already have them loaded
+    code = (
+        "import sys\n"
+        "import main\n"
+        f"print([name for name in {HEAVY_MODULES!r} if name in sys.modules])\n"
+    )
+    env = {**os.environ, "BOT_TOKEN": "test", "PYTHONPATH": str(SRC)}
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=tmp_path,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.strip().splitlines()[-1] == "[]"
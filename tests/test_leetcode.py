@@ -0,0 +1,98 @@
+import asyncio
+import json
+import time
+from pathlib import Path
+
+import pytest
+from aiohttp import web
+
+from utils.leetcode import (
+    LEETCODE_PROBLEMSET_URL,
+    LeetCodeCatalogue,
+    parse_problem_slugs,
+)
+
+FIXTURE = Path(__file__).parent / "fixtures" / "leetcode_problems.json"
+
+
+class CatalogueServer:
+    """Serves the fixture catalogue locally, or fails with `status` if it is set."""
+
+    def __init__(self):
+        self.status = 200
+        self.requests = 0
+        self.runner = None
+        self.url = None
+
+    async def handle(self, request):
+        self.requests += 1
+        if self.status != 200:
+            return web.Response(status=self.status)
+        return web.Response(body=FIXTURE.read_bytes(), content_type="application/json")
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_get("/api/problems/all/", self.handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}/api/problems/all/"
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.runner.cleanup()
+
+
+def test_parse_skips_paid_and_malformed_problems():
+    data = json.loads(FIXTURE.read_text())
+    assert parse_problem_slugs(data) == ["two-sum", "add-two-numbers"]
+    assert parse_problem_slugs({}) == []
+
+
+def test_refresh_persists_the_catalogue(tmp_path):
+    path = tmp_path / "leetcode_problems.json"
+
+    async def scenario():
+        async with CatalogueServer() as server:
+            catalogue = LeetCodeCatalogue(path, url=server.url)
+            await catalogue.refresh()
+            return catalogue
+
+    catalogue = asyncio.run(scenario())
+    assert catalogue.slugs == ["two-sum", "add-two-numbers"]
+    assert json.loads(path.read_text())["slugs"] == catalogue.slugs
+
+    # A new catalogue answers from disk without downloading
+    reloaded = LeetCodeCatalogue(path, url="http://127.0.0.1:9/unreachable")
+    url = asyncio.run(reloaded.random_problem_url())
+    assert url in {
+        "https://leetcode.com/problems/two-sum/",
+        "https://leetcode.com/problems/add-two-numbers/",
+    }
+    assert reloaded.fetched_at == pytest.approx(catalogue.fetched_at)
+
+
+@pytest.mark.parametrize("status", [429, 503])
+def test_failed_refresh_backs_off(tmp_path, status):
+    path = tmp_path / "leetcode_problems.json"
+
+    async def scenario():
+        async with CatalogueServer() as server:
+            server.status = status
+            catalogue = LeetCodeCatalogue(path, url=server.url, retry_delay=600)
+            first = await catalogue.random_problem_url()
+            await catalogue._refresh_task
+            # Further picks within the retry delay don't download again
+            for _ in range(5):
+                assert await catalogue.random_problem_url() == LEETCODE_PROBLEMSET_URL
+                await asyncio.sleep(0)
+            return first, catalogue, server.requests
+
+    first, catalogue, requests = asyncio.run(scenario())
+    assert first == LEETCODE_PROBLEMSET_URL
+    assert requests == 1
+    assert not path.exists()
+    next_refresh = catalogue.fetched_at + catalogue.refresh_interval
+    assert next_refresh == pytest.approx(time.time() + 600, abs=5)
@@ -0,0 +1,11 @@
+import random
+
+from utils.loop_monitor import LoopMonitor
+
+
+def test_running_maximum_matches_the_window():
+    monitor = LoopMonitor(window=50)
+    rng = random.Random(0)
+    for _ in range(1000):
+        window_max = monitor._record(rng.expovariate(100))
+        assert window_max == max(monitor.samples)
@@ -0,0 +1,33 @@
+import asyncio
+from types import SimpleNamespace
+
+from commands import gemini
+
+
+class StubBot:
+    def __init__(self):
+        self.fetched = []
+
+    def get_user(self, user_id):
+        return None
+
+    async def fetch_user(self, user_id):
+        self.fetched.append(user_id)
+        return SimpleNamespace(name=f"user{user_id}")
+
+
+def test_mentions_past_the_fetch_limit_are_not_cached(monkeypatch):
+    monkeypatch.setattr(gemini, "_username_cache", gemini.OrderedDict())
+    monkeypatch.setattr(gemini, "MAX_MENTION_FETCHES", 2)
+    bot = StubBot()
+
+    message = " ".join(f"<@{user_id}>" for user_id in (1, 2, 3))
+    swapped = asyncio.run(gemini.swap_mention_with_username(message, bot))
+    assert len(bot.fetched) == 2
+    assert swapped.count("Unknown user") == 1
+    assert len(gemini._username_cache) == 2
+
+    # The user left out is looked up the next time they are mentioned
+    (skipped,) = {1, 2, 3} - set(bot.fetched)
+    swapped = asyncio.run(gemini.swap_mention_with_username(f"<@{skipped}>", bot))
+    assert swapped == f"@user{skipped}"
@@ -0,0 +1,27 @@
+import asyncio
+import socket
+
+import pytest
+
+from utils.metrics import Registry
+
+
+def test_busy_port_raises_and_leaves_no_server():
+    registry = Registry(enabled=True)
+    with socket.socket() as busy:
+        busy.bind(("127.0.0.1", 0))
+        busy.listen()
+        port = busy.getsockname()[1]
+
+        with pytest.raises(OSError):
+            asyncio.run(registry.start_server("127.0.0.1", port))
+    assert registry._runner is None
+
+
+def test_disabled_registry_hands_out_no_op_metrics():
+    registry = Registry(enabled=False)
+    counter = registry.counter("duckbot_test_total", "A test counter", ("kind",))
+    counter.labels("a").inc()
+    with registry.histogram("duckbot_test_seconds", "A test histogram").time():
+        pass
+    assert registry.render() == "\n"